@@ -1,19 +1,85 @@
 from flask import Flask, request, jsonify
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import joinedload
+from sqlalchemy.engine import Engine
+from datetime import datetime, timedelta
 from flask_cors import CORS
+from db_routing import LAST_WRITE_HEADER, REPLICA_BIND, RoutingSession, init_read_replica, read_only
+from serializers import (from_cents, paginate, serialize_appointment, serialize_budget, serialize_occurrence,
+                         serialize_patient, serialize_series, to_cents)
+from status_codes import (AppointmentStatus, BudgetStatus, appointment_status_code, appointment_status_label,
+                          budget_status_code, budget_status_label)
+from recurrence import FREQUENCIES, expand, is_occurrence, last_occurrence_start
+from logging_config import init_request_logging, sampled_logger, setup_logging
+from message_templates import DEFAULT_LOCALE, LOCALE_FORMATS, TEMPLATE_FIELDS, templates, validate_template
+import logging
+import sqlite3
 import os
 
+# Logs em JSON gravados em outra thread (ver logging_config.py); LOG_FILE ativa o arquivo
+setup_logging('app')
+logger = logging.getLogger(__name__)
+# Uma linha por mensagem de WhatsApp: gravada por amostragem
+message_logger = sampled_logger(f'{__name__}.messages')
+
 app = Flask(__name__)
+init_request_logging(app)
 
 cors_origins = os.environ.get("CORS_ORIGINS", "*").split(',')
-CORS(app, resources={r"/*": {"origins": cors_origins}})
-
-app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///odontosoft.db")
+# O frontend lê X-Last-Write das escritas e o reenvia nas leituras (ver db_routing.py)
+CORS(app, resources={r"/*": {"origins": cors_origins}},
+     expose_headers=[LAST_WRITE_HEADER, 'X-Request-ID'])
+
+# Ajustes do pool de conexões (cada worker do gunicorn tem o seu próprio pool)
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", 5000))
+
+def normalize_database_url(url):
+    # Render/Heroku fornecem "postgres://", que o SQLAlchemy não aceita mais
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql://", 1)
+    return url
+
+def engine_options_for(url):
+    if url.startswith("sqlite"):
+        return {
+            "connect_args": {"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+        }
+    return {
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", 10)),
+        "pool_timeout": int(os.environ.get("DB_POOL_TIMEOUT", 30)),
+        "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", 1800)), # Evita conexões derrubadas pelo servidor
+        "pool_pre_ping": True,
+    }
+
+database_url = normalize_database_url(os.environ.get("DATABASE_URL", "sqlite:///odontosoft.db"))
+app.config["SQLALCHEMY_DATABASE_URI"] = database_url
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options_for(database_url)
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+
+# Réplica de leitura opcional (ver db_routing.py)
+read_database_url = os.environ.get("READ_DATABASE_URL")
+if read_database_url:
+    read_database_url = normalize_database_url(read_database_url)
+    app.config["SQLALCHEMY_BINDS"] = {
+        REPLICA_BIND: {"url": read_database_url, **engine_options_for(read_database_url)}
+    }
+
 app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "uma_chave_secreta_padrao_muito_insegura")
 
-db = SQLAlchemy(app)
+db = SQLAlchemy(app, session_options={"class_": RoutingSession})
+init_read_replica(app, db)
+
+@event.listens_for(Engine, "connect")
+def configure_sqlite_connection(dbapi_connection, connection_record):
+    """Ativa WAL e busy_timeout no SQLite para leituras e escritas concorrentes."""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
 
 # Definição dos modelos de dados
 class Patient(db.Model):
@@ -22,7 +88,7 @@ class Patient(db.Model):
     # phone = db.Column(db.String(20), unique=True, nullable=False) # Removido conforme solicitado
     email = db.Column(db.String(100), unique=True, nullable=True)
     responsible_name = db.Column(db.String(100), nullable=False) # Tornando obrigatório
-    responsible_phone = db.Column(db.String(20), nullable=False) # Tornando obrigatório
+    responsible_phone = db.Column(db.String(20), nullable=False, index=True) # Tornando obrigatório
     responsible_cpf = db.Column(db.String(14), unique=True, nullable=True) # Novo campo CPF
     address_zip_code = db.Column(db.String(10), nullable=True) # Novo campo CEP
     address_street = db.Column(db.String(255), nullable=True) # Novo campo Rua
@@ -31,39 +97,177 @@ class Patient(db.Model):
     address_neighborhood = db.Column(db.String(100), nullable=True) # Novo campo Bairro
     address_city = db.Column(db.String(100), nullable=True) # Novo campo Cidade
     address_state = db.Column(db.String(2), nullable=True) # Novo campo Estado (UF)
+    # Muda a cada escrita no paciente, nos agendamentos ou nos orçamentos dele (ETag do prontuário)
+    record_version = db.Column(db.Integer, nullable=True, default=0)
 
     # Relacionamentos
     # Renomeado backref para 'patient_appointments' para evitar conflito
     appointments = db.relationship('Appointment', backref='patient_data', lazy=True)
     budgets = db.relationship('Budget', backref='patient_data', lazy=True) # backref para Budget
+    appointment_series = db.relationship('AppointmentSeries', backref='patient_data', lazy=True)
 
     def __repr__(self):
         return f'<Patient {self.name}>'
 
 class Appointment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False)
-    start_time = db.Column(db.DateTime, nullable=False)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False, index=True)
+    start_time = db.Column(db.DateTime, nullable=False, index=True)
     end_time = db.Column(db.DateTime, nullable=False)
-    status = db.Column(db.String(50), default='Agendado')
+    status_code = db.Column(db.SmallInteger, nullable=False, default=AppointmentStatus.AGENDADO) # Ver status_codes.py
     notes = db.Column(db.Text, nullable=True)
     treatment_type = db.Column(db.String(100), nullable=True)
+    series_id = db.Column(db.Integer, db.ForeignKey('appointment_series.id'), nullable=True) # Série recorrente de origem
+    original_start = db.Column(db.DateTime, nullable=True) # Ocorrência da série que esta linha substitui
+
+    __table_args__ = (
+        # Filtros por status já retornam ordenados por horário
+        db.Index('ix_appointment_status_code_start_time', 'status_code', 'start_time'),
+        # Cada ocorrência de uma série tem no máximo uma exceção materializada
+        db.Index('ix_appointment_series_id_original_start', 'series_id', 'original_start', unique=True),
+    )
 
     def __repr__(self):
         return f'<Appointment {self.start_time} - {self.patient_data.name}>' # Usando patient_data
 
+# Série de agendamentos recorrentes: guardada uma vez e expandida sob demanda (ver recurrence.py)
+class AppointmentSeries(db.Model):
+    __tablename__ = 'appointment_series'
+    id = db.Column(db.Integer, primary_key=True)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False, index=True)
+    dtstart = db.Column(db.DateTime, nullable=False) # Início da primeira ocorrência
+    duration_minutes = db.Column(db.Integer, nullable=False)
+    freq = db.Column(db.String(10), nullable=False) # DAILY, WEEKLY ou MONTHLY
+    interval = db.Column(db.Integer, nullable=False, default=1)
+    count = db.Column(db.Integer, nullable=True) # Quantidade de ocorrências (opcional)
+    until = db.Column(db.DateTime, nullable=True) # Data limite (opcional)
+    ends_at = db.Column(db.DateTime, nullable=True) # Fim da última ocorrência; vazio para séries sem fim
+    treatment_type = db.Column(db.String(100), nullable=True)
+    notes = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_appointment_series_dtstart_ends_at', 'dtstart', 'ends_at'),
+    )
+
+    def __repr__(self):
+        return f'<AppointmentSeries {self.id} {self.freq}/{self.interval}>'
+
 # Classe Budget (Orçamento)
 class Budget(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False, index=True)
     description = db.Column(db.String(255), nullable=False)
-    total_value = db.Column(db.Float, nullable=False)
-    status = db.Column(db.String(50), default='Pendente')
+    total_value_cents = db.Column(db.BigInteger, nullable=False) # Valor em centavos
+    status_code = db.Column(db.SmallInteger, nullable=False, default=BudgetStatus.PENDENTE) # Ver status_codes.py
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Índice de cobertura: somas por status são respondidas só com o índice
+        db.Index('ix_budget_status_code_total_value_cents', 'status_code', 'total_value_cents'),
+    )
+
     def __repr__(self):
         return f'<Budget {self.id} - {self.description}>'
 
+# Classe MessageTemplate (texto personalizado de uma mensagem de WhatsApp)
+class MessageTemplate(db.Model):
+    __tablename__ = 'message_template'
+    id = db.Column(db.Integer, primary_key=True)
+    clinic_id = db.Column(db.Integer, nullable=True) # Vazio vale para a instalação inteira
+    name = db.Column(db.String(50), nullable=False) # Ver TEMPLATE_FIELDS em message_templates.py
+    locale = db.Column(db.String(10), nullable=False, default=DEFAULT_LOCALE)
+    body = db.Column(db.Text, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_message_template_clinic_id_name_locale', 'clinic_id', 'name', 'locale', unique=True),
+    )
+
+    def __repr__(self):
+        return f'<MessageTemplate {self.name}/{self.locale} clínica {self.clinic_id}>'
+
+@event.listens_for(RoutingSession, 'before_flush')
+def bump_patient_record_version(db_session, flush_context, instances):
+    """Incrementa a versão do prontuário dos pacientes afetados pela gravação."""
+    patient_ids = set()
+    for obj in [*db_session.new, *db_session.dirty, *db_session.deleted]:
+        if isinstance(obj, (Appointment, Budget)):
+            patient_ids.add(obj.patient_id)
+            # Agendamento ou orçamento transferido: o prontuário antigo também muda
+            patient_ids.update(db.inspect(obj).attrs.patient_id.history.deleted)
+        elif isinstance(obj, Patient) and obj not in db_session.new:
+            patient_ids.add(obj.id)
+    patient_ids.discard(None)
+    if patient_ids:
+        db_session.execute(
+            db.update(Patient)
+            .where(Patient.id.in_(patient_ids))
+            .values(record_version=db.func.coalesce(Patient.record_version, 0) + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+def load_template_overrides():
+    """Personalizações de templates salvas no banco, no formato esperado por templates.set_loader."""
+    with app.app_context():
+        return db.session.query(
+            MessageTemplate.clinic_id, MessageTemplate.name, MessageTemplate.locale, MessageTemplate.body
+        ).all()
+
+# Recarrega as personalizações periodicamente (cada worker do gunicorn tem seu cache)
+templates.set_loader(load_template_overrides)
+
+# Duração máxima considerada ao buscar agendamentos que começaram antes de um período
+MAX_APPOINTMENT_DURATION = timedelta(hours=12)
+
+def parse_range(args):
+    """Lê os parâmetros start e end (ISO 8601) de um período; ValueError se inválidos."""
+    if not args.get('start') or not args.get('end'):
+        raise ValueError('Informe start e end (ISO 8601).')
+    range_start = datetime.fromisoformat(args['start'])
+    range_end = datetime.fromisoformat(args['end'])
+    if range_end <= range_start:
+        raise ValueError('end deve ser posterior a start.')
+    return range_start, range_end
+
+def load_calendar(range_start, range_end, status_code=None):
+    """
+    Agendamentos que se sobrepõem ao período, incluindo ocorrências virtuais das séries.
+    Só as séries ativas no período são expandidas, e só dentro dele.
+    """
+    query = Appointment.query.options(joinedload(Appointment.patient_data)).filter(
+        Appointment.start_time < range_end,
+        Appointment.start_time > range_start - MAX_APPOINTMENT_DURATION,
+        Appointment.end_time > range_start
+    )
+    if status_code is not None:
+        query = query.filter(Appointment.status_code == status_code)
+    output = [serialize_appointment(appt) for appt in query]
+
+    if status_code is not None and status_code != AppointmentStatus.AGENDADO:
+        return sorted(output, key=lambda item: item['start_time'])
+
+    series_list = AppointmentSeries.query.options(joinedload(AppointmentSeries.patient_data)).filter(
+        AppointmentSeries.dtstart < range_end,
+        db.or_(AppointmentSeries.ends_at.is_(None), AppointmentSeries.ends_at > range_start)
+    ).all()
+    if series_list:
+        # Ocorrências com exceção materializada já aparecem (ou não) pela linha própria
+        overridden = {
+            (series_id, original_start)
+            for series_id, original_start in db.session.query(Appointment.series_id, Appointment.original_start).filter(
+                Appointment.series_id.in_([series.id for series in series_list]),
+                Appointment.original_start < range_end,
+                Appointment.original_start > range_start - MAX_APPOINTMENT_DURATION
+            )
+        }
+        for series in series_list:
+            for start, end in expand(series, range_start, range_end):
+                if (series.id, start) not in overridden:
+                    output.append(serialize_occurrence(series, start, end))
+
+    return sorted(output, key=lambda item: item['start_time'])
+
 # Exemplo de endpoint de teste
 @app.route('/')
 def hello():
@@ -102,28 +306,53 @@ def add_patient():
         return jsonify({'message': f'Erro ao adicionar paciente: {str(e)}'}), 500
 
 @app.route('/patients', methods=['GET'])
+@read_only
 def get_patients():
     patients = Patient.query.all()
-    output = []
-    for patient in patients:
-        patient_data = {
-            'id': patient.id,
-            'name': patient.name,
-            'email': patient.email,
-            'responsible_name': patient.responsible_name,
-            'responsible_phone': patient.responsible_phone,
-            'responsible_cpf': patient.responsible_cpf,
-            'address_zip_code': patient.address_zip_code,
-            'address_street': patient.address_street,
-            'address_number': patient.address_number,
-            'address_complement': patient.address_complement,
-            'address_neighborhood': patient.address_neighborhood,
-            'address_city': patient.address_city,
-            'address_state': patient.address_state
-        }
-        output.append(patient_data)
+    output = [serialize_patient(patient) for patient in patients]
     return jsonify({'patients': output})
 
+@app.route('/patients/<int:patient_id>', methods=['GET'])
+@read_only
+def get_patient_record(patient_id):
+    # Prontuário: paciente + uma página de cada histórico (COUNT + LIMIT/OFFSET), em até 5 consultas
+    patient = db.session.get(Patient, patient_id)
+    if patient is None:
+        return jsonify({'message': 'Paciente não encontrado.'}), 404
+
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+    appointments_page = max(request.args.get('appointments_page', 1, type=int), 1)
+    budgets_page = max(request.args.get('budgets_page', 1, type=int), 1)
+
+    # ETag pela versão do prontuário e página pedida: reaberturas sem alteração
+    # recebem 304 sem consultar nem serializar os históricos
+    etag = f'{patient.id}-{patient.record_version or 0}-{per_page}-{appointments_page}-{budgets_page}'
+    if etag in request.if_none_match:
+        response = app.response_class(status=304)
+    else:
+
+        appointments = Appointment.query.filter_by(patient_id=patient_id).order_by(
+            Appointment.start_time.desc(), Appointment.id.desc()
+        )
+        budgets = Budget.query.filter_by(patient_id=patient_id).order_by(
+            Budget.created_at.desc(), Budget.id.desc()
+        )
+
+        response = jsonify({
+            'patient': serialize_patient(patient),
+            'appointments': paginate(
+                appointments, appointments_page, per_page,
+                lambda appt: serialize_appointment(appt, patient.name)
+            ),
+            'budgets': paginate(
+                budgets, budgets_page, per_page,
+                lambda budget: serialize_budget(budget, patient.name)
+            )
+        })
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
 @app.route('/appointments', methods=['POST'])
 def add_appointment():
     data = request.get_json()
@@ -150,33 +379,159 @@ def add_appointment():
         return jsonify({'message': f'Erro ao adicionar agendamento: {str(e)}'}), 500
 
 @app.route('/appointments', methods=['GET'])
+@read_only
 def get_appointments():
-    appointments = Appointment.query.all()
-    output = []
-    for appt in appointments:
-        # Verifica se patient_data existe antes de acessar .name
-        patient_name = appt.patient_data.name if appt.patient_data else "Paciente Desconhecido"
-        appointment_data = {
-            'id': appt.id,
-            'patient_id': appt.patient_id,
-            'patient_name': patient_name,
-            'start_time': appt.start_time.isoformat(),
-            'end_time': appt.end_time.isoformat(),
-            'status': appt.status,
-            'notes': appt.notes,
-            'treatment_type': appt.treatment_type
-        }
-        output.append(appointment_data)
+    status_code = None
+    if request.args.get('status'):
+        try:
+            status_code = appointment_status_code(request.args['status'])
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+
+    # Com start e end, devolve o calendário do período incluindo as ocorrências das séries
+    if request.args.get('start') or request.args.get('end'):
+        try:
+            range_start, range_end = parse_range(request.args)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        return jsonify({'appointments': load_calendar(range_start, range_end, status_code=status_code)})
+
+    query = Appointment.query
+    if status_code is not None:
+        query = query.filter_by(status_code=status_code)
+    appointments = query.all()
+    output = [serialize_appointment(appt) for appt in appointments]
     return jsonify({'appointments': output})
 
+@app.route('/appointments/conflicts', methods=['GET'])
+@read_only
+def get_appointment_conflicts():
+    # Agendamentos e ocorrências (não cancelados) que se sobrepõem ao horário informado
+    try:
+        range_start, range_end = parse_range(request.args)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    conflicts = [
+        item for item in load_calendar(range_start, range_end)
+        if item['status'] != appointment_status_label(AppointmentStatus.CANCELADO)
+    ]
+    return jsonify({'conflicts': conflicts})
+
+@app.route('/appointment-series', methods=['POST'])
+def add_appointment_series():
+    data = request.get_json()
+    try:
+        start_time = datetime.fromisoformat(data['start_time'])
+        end_time = datetime.fromisoformat(data['end_time'])
+        until = datetime.fromisoformat(data['until']) if data.get('until') else None
+        patient_id = int(data['patient_id'])
+        freq = (data.get('freq') or '').upper()
+        interval = int(data.get('interval', 1))
+        count = int(data['count']) if data.get('count') is not None else None
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'message': f'Dados da série inválidos: {str(e)}'}), 400
+
+    if freq not in FREQUENCIES:
+        return jsonify({'message': f'Frequência deve ser uma de: {", ".join(FREQUENCIES)}.'}), 400
+    if end_time <= start_time or interval < 1 or (count is not None and count < 1):
+        return jsonify({'message': 'Horário, intervalo ou quantidade de ocorrências inválidos.'}), 400
+
+    last_start = last_occurrence_start(start_time, freq, interval, count, until)
+    if last_start is None and until is not None:
+        return jsonify({'message': 'A data limite é anterior à primeira ocorrência.'}), 400
+    duration = end_time - start_time
+
+    new_series = AppointmentSeries(
+        patient_id=patient_id,
+        dtstart=start_time,
+        duration_minutes=int(duration.total_seconds() // 60),
+        freq=freq,
+        interval=interval,
+        count=count,
+        until=until,
+        ends_at=last_start + duration if last_start else None,
+        treatment_type=data.get('treatment_type'),
+        notes=data.get('notes')
+    )
+    try:
+        db.session.add(new_series)
+        db.session.commit()
+        return jsonify({'message': 'Appointment series added successfully!', 'series_id': new_series.id}), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'Erro ao adicionar série de agendamentos: {str(e)}'}), 500
+
+@app.route('/appointment-series/<int:series_id>', methods=['GET'])
+@read_only
+def get_appointment_series(series_id):
+    series = db.session.get(AppointmentSeries, series_id)
+    if series is None:
+        return jsonify({'message': 'Série não encontrada.'}), 404
+    return jsonify(serialize_series(series))
+
+@app.route('/appointment-series/<int:series_id>/occurrences', methods=['POST'])
+def override_series_occurrence(series_id):
+    # Materializa uma exceção (remarcação, cancelamento, observação) para uma ocorrência da série
+    series = db.session.get(AppointmentSeries, series_id)
+    if series is None:
+        return jsonify({'message': 'Série não encontrada.'}), 404
+
+    data = request.get_json()
+    try:
+        original_start = datetime.fromisoformat(data['original_start'])
+        status_code = appointment_status_code(data['status']) if data.get('status') else None
+        start_time = datetime.fromisoformat(data['start_time']) if data.get('start_time') else None
+        end_time = datetime.fromisoformat(data['end_time']) if data.get('end_time') else None
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'message': f'Dados da ocorrência inválidos: {str(e)}'}), 400
+    if not is_occurrence(series, original_start):
+        return jsonify({'message': 'original_start não corresponde a uma ocorrência da série.'}), 400
+
+    appointment = Appointment.query.filter_by(series_id=series.id, original_start=original_start).first()
+    created = appointment is None
+    if created:
+        appointment = Appointment(
+            patient_id=series.patient_id,
+            series_id=series.id,
+            original_start=original_start,
+            start_time=original_start,
+            end_time=original_start + timedelta(minutes=series.duration_minutes),
+            notes=series.notes,
+            treatment_type=series.treatment_type
+        )
+        db.session.add(appointment)
+
+    if start_time:
+        appointment.start_time = start_time
+    if end_time:
+        appointment.end_time = end_time
+    if status_code is not None:
+        appointment.status_code = status_code
+    for field in ('notes', 'treatment_type'):
+        if field in data:
+            setattr(appointment, field, data[field])
+
+    try:
+        db.session.commit()
+        return jsonify({'message': 'Occurrence saved successfully!', 'appointment_id': appointment.id}), 201 if created else 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'Erro ao salvar ocorrência: {str(e)}'}), 500
+
 @app.route('/budgets', methods=['POST'])
 def add_budget():
     data = request.get_json()
+    try:
+        total_value_cents = to_cents(data['total_value'])
+        status_code = budget_status_code(data.get('status', 'Pendente'))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
     new_budget = Budget(
         patient_id=data['patient_id'],
         description=data['description'],
-        total_value=data['total_value'],
-        status=data.get('status', 'Pendente')
+        total_value_cents=total_value_cents,
+        status_code=status_code
     )
     try:
         db.session.add(new_budget)
@@ -187,58 +542,148 @@ def add_budget():
         return jsonify({'message': f'Erro ao adicionar orçamento: {str(e)}'}), 500
 
 @app.route('/budgets', methods=['GET'])
+@read_only
 def get_budgets():
-    budgets = Budget.query.all()
-    output = []
-    for budget in budgets:
-        patient_name = budget.patient_data.name if budget.patient_data else "Paciente Desconhecido"
-        budget_data = {
-            'id': budget.id,
-            'patient_id': budget.patient_id,
-            'patient_name': patient_name,
-            'description': budget.description,
-            'total_value': budget.total_value,
-            'status': budget.status,
-            'created_at': budget.created_at.isoformat()
-        }
-        output.append(budget_data)
+    query = Budget.query
+    if request.args.get('status'):
+        try:
+            query = query.filter_by(status_code=budget_status_code(request.args['status']))
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+    budgets = query.all()
+    output = [serialize_budget(budget) for budget in budgets]
     return jsonify({'budgets': output})
 
+@app.route('/budgets/summary', methods=['GET'])
+@read_only
+def get_budgets_summary():
+    # Contagem e soma por status, respondidas pelo índice (status_code, total_value_cents)
+    rows = db.session.query(
+        Budget.status_code,
+        db.func.count(),
+        # SUM(bigint) é numeric no PostgreSQL; o cast mantém o resultado inteiro
+        db.cast(db.func.coalesce(db.func.sum(Budget.total_value_cents), 0), db.BigInteger)
+    ).group_by(Budget.status_code).all()
+
+    output = [
+        {'status': budget_status_label(code), 'count': count, 'total_value': from_cents(total)}
+        for code, count, total in rows
+    ]
+    return jsonify({
+        'summary': output,
+        'total_value': from_cents(sum(total for _, _, total in rows))
+    })
+
+@app.route('/message-templates', methods=['GET'])
+@read_only
+def get_message_templates():
+    clinic_id = request.args.get('clinic_id', type=int)
+    locale = request.args.get('locale', DEFAULT_LOCALE)
+    if locale not in LOCALE_FORMATS:
+        return jsonify({'message': f'Idioma não suportado: {locale}'}), 400
+
+    customized = {
+        row.name for row in MessageTemplate.query.filter_by(clinic_id=clinic_id, locale=locale)
+    }
+    output = [{
+        'name': name,
+        'locale': locale,
+        'clinic_id': clinic_id,
+        'fields': list(fields),
+        'body': templates.get(name, locale, clinic_id).source,
+        'customized': name in customized
+    } for name, fields in TEMPLATE_FIELDS.items()]
+    return jsonify({'templates': output})
+
+@app.route('/message-templates/<name>', methods=['PUT'])
+def set_message_template(name):
+    data = request.get_json()
+    clinic_id = data.get('clinic_id')
+    locale = data.get('locale', DEFAULT_LOCALE)
+    body = data.get('body')
+    if clinic_id is not None:
+        # Mesma chave da listagem e do registro: 1 e "1" são a mesma clínica
+        try:
+            if isinstance(clinic_id, (bool, float)):
+                raise ValueError
+            clinic_id = int(clinic_id)
+        except (TypeError, ValueError):
+            return jsonify({'message': f'clinic_id inválido: {clinic_id}'}), 400
+    if locale not in LOCALE_FORMATS:
+        return jsonify({'message': f'Idioma não suportado: {locale}'}), 400
+    if not body:
+        return jsonify({'message': 'Informe o texto do template (body).'}), 400
+    try:
+        validate_template(name, body)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    try:
+        template = MessageTemplate.query.filter_by(clinic_id=clinic_id, name=name, locale=locale).first()
+        if template is None:
+            template = MessageTemplate(clinic_id=clinic_id, name=name, locale=locale, body=body)
+            db.session.add(template)
+        else:
+            template.body = body
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'Erro ao salvar template: {str(e)}'}), 500
+
+    # Os demais workers recebem a alteração na próxima recarga periódica
+    templates.set_override(name, locale, body, clinic_id)
+    return jsonify({'message': 'Template salvo com sucesso!', 'name': name, 'locale': locale}), 200
+
 @app.route('/whatsapp/send-confirmation', methods=['POST'])
 def send_whatsapp_confirmation():
     data = request.get_json()
     appointment_id = data.get('appointment_id')
-    print(f"Simulando envio de confirmação para agendamento {appointment_id} via WhatsApp.")
+    message_logger.info(f"Simulando envio de confirmação para agendamento {appointment_id} via WhatsApp.",
+                        extra={'appointment_id': appointment_id})
     return jsonify({'message': f'Confirmação para agendamento {appointment_id} enviada com sucesso (simulado)!'})
 
 @app.route('/whatsapp/send-reminder/<int:patient_id>', methods=['POST'])
 def send_whatsapp_reminder(patient_id):
     data = request.get_json()
     return_type = data.get('return_type', 'revisão')
-    print(f"Simulando envio de lembrete de retorno para paciente {patient_id} ({return_type}) via WhatsApp.")
+    message_logger.info(f"Simulando envio de lembrete de retorno para paciente {patient_id} ({return_type}) via WhatsApp.",
+                        extra={'patient_id': patient_id, 'return_type': return_type})
     return jsonify({'message': f'Lembrete de retorno para paciente {patient_id} enviado com sucesso (simulado)!'})
 
 @app.route('/automation/pending-confirmations', methods=['GET'])
+@read_only
 def get_pending_confirmations():
-    appointments = Appointment.query.filter_by(status='Agendado').all()
+    # Agendamentos ainda não confirmados das próximas `hours` horas, incluindo ocorrências das séries
+    hours = min(max(request.args.get('hours', 24, type=int), 1), 24 * 31)
+    range_start = datetime.now()
+    appointments = [
+        item for item in load_calendar(range_start, range_start + timedelta(hours=hours), AppointmentStatus.AGENDADO)
+        if item['start_time'] >= range_start.isoformat()
+    ]
+    phones = dict(db.session.query(Patient.id, Patient.responsible_phone).filter(
+        Patient.id.in_({item['patient_id'] for item in appointments})
+    )) if appointments else {}
+
     output = []
-    for appt in appointments:
-        patient_phone = appt.patient_data.responsible_phone if appt.patient_data else None
+    for item in appointments:
         output.append({
-            'id': appt.id,
-            'patient_id': appt.patient_id,
-            'patient_name': appt.patient_data.name if appt.patient_data else "Desconhecido",
-            'start_time': appt.start_time.isoformat(),
-            'phone': patient_phone,
+            'id': item['id'],
+            'patient_id': item['patient_id'],
+            'patient_name': item['patient_name'],
+            'start_time': item['start_time'],
+            'phone': phones.get(item['patient_id']),
+            'series_id': item['series_id'],
+            'original_start': item['original_start'],
         })
     return jsonify({'appointments': output})
 
 @app.route('/automation/send-all-confirmations', methods=['POST'])
 def send_all_confirmations_automation():
-    print("Simulando envio de todas as confirmações pendentes.")
+    logger.info("Simulando envio de todas as confirmações pendentes.")
     return jsonify({'message': 'Todas as confirmações pendentes enviadas (simulado)!'})
 
 @app.route('/automation/return-reminders', methods=['GET'])
+@read_only
 def get_return_reminders():
     days_after = request.args.get('days_after', type=int)
     patients = Patient.query.all()
@@ -254,7 +699,7 @@ def get_return_reminders():
 @app.route('/automation/cleanup-logs', methods=['POST'])
 def cleanup_logs_automation():
     cutoff_date_str = request.get_json().get('cutoff_date')
-    print(f"Simulando limpeza de logs antigos antes de {cutoff_date_str}.")
+    logger.info(f"Simulando limpeza de logs antigos antes de {cutoff_date_str}.", extra={'cutoff_date': cutoff_date_str})
     return jsonify({'message': 'Limpeza de logs concluída (simulado)!'})
 
 @app.route('/whatsapp/webhook', methods=['POST'])
@@ -264,7 +709,9 @@ def whatsapp_webhook():
     message_text = data.get('message')
     timestamp = data.get('timestamp')
 
-    print(f"Mensagem recebida do WhatsApp: De {phone}, Mensagem: '{message_text}', Tempo: {timestamp}")
+    message_logger.info(f"Mensagem recebida do WhatsApp: De {phone}", extra={
+        'phone': phone, 'message_text': message_text, 'message_timestamp': timestamp
+    })
 
     if "SIM" in message_text.upper():
         response_message = "Obrigado por confirmar! Seu agendamento está mantido."
@@ -276,6 +723,13 @@ def whatsapp_webhook():
     return jsonify({'status': 'success', 'response': response_message}), 200
 
 if __name__ == '__main__':
+    # Aplica as migrações pendentes em vez de recriar o esquema (ver migrations.py)
+    from migrations import upgrade
     with app.app_context():
-        db.create_all()
-    app.run(debug=True, host='0.0.0.0')
+        upgrade(db.engine, db.metadata)
+    # Servidor de desenvolvimento; em produção use o gunicorn (ver gunicorn.conf.py)
+    app.run(
+        debug=os.environ.get("FLASK_DEBUG") == "1",
+        host='0.0.0.0',
+        port=int(os.environ.get("PORT", 5000))
+    )
@@ -0,0 +1,238 @@
+"""
+Envio de anexos (PDFs de orientações, imagens) para o bot do WhatsApp.
+
+Cada arquivo é lido do disco por mapeamento em memória (mmap), em blocos, e
+identificado pelo SHA-256 do conteúdo. O bot recebe cada arquivo distinto uma
+única vez; os envios seguintes reaproveitam o media id devolvido no upload,
+guardado em um cache LRU com expiração. Assim, mandar o mesmo PDF para 200
+responsáveis custa um upload, não 200.
+"""
+
+import hashlib
+import logging
+import mimetypes
+import mmap
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+# Quantidade de media ids guardados e por quanto tempo (segundos) cada um vale
+MEDIA_CACHE_SIZE = int(os.environ.get("MEDIA_CACHE_SIZE", 256))
+MEDIA_CACHE_TTL = float(os.environ.get("MEDIA_CACHE_TTL", 24 * 60 * 60))
+
+UPLOAD_TIMEOUT = 60
+
+
+class AttachmentError(Exception):
+    """Falha ao ler ou enviar um anexo."""
+
+
+def iter_file_chunks(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Lê o arquivo em blocos de até `chunk_size` bytes via mmap.
+    Só um bloco fica em memória por vez, qualquer que seja o tamanho do arquivo.
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            # mmap não aceita arquivos vazios
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for offset in range(0, size, chunk_size):
+                yield mm[offset:offset + chunk_size]
+
+
+class _FileBody:
+    """Corpo de upload lido em blocos; o tamanho conhecido vira o Content-Length."""
+
+    def __init__(self, path: str, size: int, chunk_size: int):
+        self.path = path
+        self.size = size
+        self.chunk_size = chunk_size
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        return iter_file_chunks(self.path, self.chunk_size)
+
+
+class _DigestCache:
+    """SHA-256 por arquivo, recalculado só quando tamanho ou data de modificação mudam."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, int], str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def digest(self, path: str) -> Tuple[str, int]:
+        stat = os.stat(path)
+        signature = (stat.st_size, stat.st_mtime_ns)
+        key = os.path.abspath(path)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached and cached[0] == signature:
+                self._entries.move_to_end(key)
+                return cached[1], stat.st_size
+
+        sha256 = hashlib.sha256()
+        for chunk in iter_file_chunks(path):
+            sha256.update(chunk)
+        value = sha256.hexdigest()
+
+        with self._lock:
+            self._entries[key] = (signature, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value, stat.st_size
+
+
+class MediaCache:
+    def __init__(self, max_entries: int = MEDIA_CACHE_SIZE, ttl: float = MEDIA_CACHE_TTL):
+        """
+        Cache LRU com expiração: SHA-256 do arquivo -> media id no bot.
+
+        Args:
+            max_entries: Quantidade máxima de arquivos lembrados
+            ttl: Validade de cada media id em segundos
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, digest: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None or entry[1] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[digest]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, digest: str, media_id: str):
+        with self._lock:
+            self._entries[digest] = (media_id, time.monotonic() + self.ttl)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, digest: str):
+        with self._lock:
+            self._entries.pop(digest, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class AttachmentUploader:
+    def __init__(self, bot_api_url: str, headers: Optional[Dict] = None,
+                 cache: Optional[MediaCache] = None, chunk_size: int = CHUNK_SIZE):
+        """
+        Envia arquivos para o endpoint /media do bot, uma vez por conteúdo.
+
+        Args:
+            bot_api_url: URL da API do bot WhatsApp
+            headers: Cabeçalhos de autenticação
+            cache: Cache de media ids (um novo se não informado)
+            chunk_size: Tamanho dos blocos lidos e enviados
+        """
+        self.upload_url = f"{bot_api_url.rstrip('/')}/media"
+        self.headers = {key: value for key, value in (headers or {}).items() if key.lower() != 'content-type'}
+        # `cache or ...` trocaria um cache compartilhado ainda vazio (len 0) por outro
+        self.cache = cache if cache is not None else MediaCache()
+        self.chunk_size = chunk_size
+        self.http = requests.Session()
+        self._digests = _DigestCache(max(self.cache.max_entries, 1) * 4)
+        # Trava e quantidade de interessados por upload em andamento
+        self._upload_locks: Dict[str, List] = {}
+        self._locks_guard = threading.Lock()
+
+    @contextmanager
+    def _single_upload(self, digest: str):
+        """Serializa os uploads de um mesmo conteúdo; a trava some quando ninguém mais a usa."""
+        with self._locks_guard:
+            entry = self._upload_locks.setdefault(digest, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._locks_guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._upload_locks[digest]
+
+    def get_media_id(self, path: str) -> Dict:
+        """
+        Media id do arquivo no bot, enviando-o só se o conteúdo ainda não estiver no cache.
+
+        Returns:
+            Dict com file, media_id, sha256, size e cached (True se não houve upload)
+        """
+        try:
+            digest, size = self._digests.digest(path)
+        except OSError as e:
+            raise AttachmentError(f"Não foi possível ler {path}: {e}")
+
+        result = {'file': os.path.basename(path), 'sha256': digest, 'size': size}
+        media_id = self.cache.get(digest)
+        if media_id:
+            return {**result, 'media_id': media_id, 'cached': True}
+
+        # Envios simultâneos do mesmo arquivo esperam um único upload
+        with self._single_upload(digest):
+            media_id = self.cache.get(digest)
+            if media_id:
+                return {**result, 'media_id': media_id, 'cached': True}
+            media_id = self._upload(path, digest, size)
+            self.cache.put(digest, media_id)
+        return {**result, 'media_id': media_id, 'cached': False}
+
+    def _upload(self, path: str, digest: str, size: int) -> str:
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        headers = {
+            **self.headers,
+            'Content-Type': content_type,
+            'X-Filename': quote(os.path.basename(path)),  # cabeçalhos só aceitam ASCII
+            'X-Content-SHA256': digest,
+        }
+        started = time.perf_counter()
+        try:
+            response = self.http.post(
+                self.upload_url,
+                data=_FileBody(path, size, self.chunk_size),
+                headers=headers,
+                timeout=UPLOAD_TIMEOUT
+            )
+            response.raise_for_status()
+            body = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            raise AttachmentError(f"Erro no upload de {os.path.basename(path)}: {e}")
+
+        # O bot pode devolver o hash recebido; divergência indica arquivo corrompido no caminho
+        if body.get('sha256') and body['sha256'] != digest:
+            raise AttachmentError(f"Checksum divergente no upload de {os.path.basename(path)}")
+        media_id = body.get('media_id')
+        if not media_id:
+            raise AttachmentError(f"O bot não devolveu media_id para {os.path.basename(path)}")
+
+        logger.info(f"Upload de {os.path.basename(path)} ({size} bytes) em "
+                    f"{(time.perf_counter() - started) * 1000:.0f} ms: {media_id}")
+        return media_id
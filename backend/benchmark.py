@@ -0,0 +1,367 @@
+"""
+Benchmarks do OdontoSoft.
+Mede latência e pico de memória de todas as rotas do app.py e dos jobs do
+OdontoSoftScheduler (executados contra a API local),
+salvando os resultados em JSON para comparar versões.
+
+Uso:
+    python seed_data.py --patients 10000 --appointments 100000 --budgets 20000
+    python benchmark.py                                 # salva em bench_results/<commit>.json
+    python benchmark.py --compare bench_results/abc1234.json
+    python benchmark.py --templates-only                # só o micro-benchmark das mensagens
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import subprocess
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from loadtest import percentile
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_results')
+
+# Corpos das requisições POST, por endpoint (recebem o número da iteração)
+REQUEST_BODIES: Dict[str, Callable[[int, Dict], Dict]] = {
+    'add_patient': lambda i, ctx: {
+        'name': f'Paciente Benchmark {i}',
+        'responsible_name': 'Responsável Benchmark',
+        'responsible_phone': '5511999999999',
+    },
+    'add_appointment': lambda i, ctx: {
+        'patient_id': ctx['patient_id'],
+        'start_time': (datetime(2030, 1, 7, 8) + timedelta(minutes=30 * i)).isoformat(),
+        'end_time': (datetime(2030, 1, 7, 8, 30) + timedelta(minutes=30 * i)).isoformat(),
+        'treatment_type': 'Profilaxia',
+    },
+    'add_budget': lambda i, ctx: {
+        'patient_id': ctx['patient_id'],
+        'description': 'Orçamento benchmark',
+        'total_value': 350.90,
+    },
+    'send_whatsapp_confirmation': lambda i, ctx: {'appointment_id': ctx['appointment_id']},
+    'send_whatsapp_reminder': lambda i, ctx: {'return_type': 'revisão'},
+    'cleanup_logs_automation': lambda i, ctx: {'cutoff_date': '2020-01-01T00:00:00'},
+    'add_appointment_series': lambda i, ctx: {
+        'patient_id': ctx['patient_id'],
+        'start_time': '2030-01-07T08:00:00',
+        'end_time': '2030-01-07T08:30:00',
+        'freq': 'MONTHLY',
+        'count': 12,
+        'treatment_type': 'Manutenção ortodôntica',
+    },
+    'override_series_occurrence': lambda i, ctx: {
+        'original_start': ctx['series_start'],
+        'notes': f'Exceção benchmark {i}',
+    },
+    'set_message_template': lambda i, ctx: {
+        'locale': 'pt_BR',
+        'clinic_id': 1,
+        'body': f'Olá {{name}}! Consulta em {{date}} às {{time}}. (benchmark {i})',
+    },
+    'whatsapp_webhook': lambda i, ctx: {
+        'phone': '5511999999999', 'message': 'SIM', 'timestamp': '2030-01-01T09:00:00'
+    },
+}
+
+# Parâmetros de consulta das rotas que exigem um período
+QUERY_STRINGS: Dict[str, Dict] = {
+    'get_appointment_conflicts': {'start': '2030-01-07T08:00:00', 'end': '2030-01-07T09:00:00'},
+}
+
+SCHEDULER_JOBS = ['confirmations', 'reminders', 'cleanup', 'health_check']
+
+
+class JobLogCapture(logging.Handler):
+    """Guarda os avisos e erros registrados pelo agendador enquanto um job roda."""
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.messages: List[str] = []
+
+    def emit(self, record: logging.LogRecord):
+        self.messages.append(record.getMessage())
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(func: Callable[[], object], iterations: int) -> Dict:
+    """
+    Executa `func` uma vez para aquecer, `iterations` vezes para latência e
+    mais uma vez com tracemalloc ativo para o pico de memória.
+    """
+    func()
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'iterations': iterations,
+        'mean_ms': round(sum(latencies) / len(latencies), 3),
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def benchmark_routes(app, ctx: Dict, iterations: int) -> List[Dict]:
+    """Mede todas as rotas registradas no app (exceto arquivos estáticos)."""
+    client = app.test_client()
+    results = []
+
+    for rule in sorted(app.url_map.iter_rules(), key=lambda r: (r.rule, sorted(r.methods))):
+        if rule.endpoint == 'static':
+            continue
+        url_values = {arg: ctx.get(arg, ctx['patient_id']) for arg in rule.arguments}
+        with app.test_request_context():
+            from flask import url_for
+            path = url_for(rule.endpoint, **url_values, **QUERY_STRINGS.get(rule.endpoint, {}))
+
+        for method in sorted(rule.methods - {'HEAD', 'OPTIONS'}):
+            counter = iter(range(10**9))
+            body_factory = REQUEST_BODIES.get(rule.endpoint)
+
+            def call(method=method, path=path, body_factory=body_factory, counter=counter):
+                body = body_factory(next(counter), ctx) if body_factory else None
+                response = client.open(path, method=method, json=body)
+                call.status = response.status_code
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = measure(call, iterations)
+            result.update({'name': f'{method} {rule.rule}', 'endpoint': rule.endpoint, 'status': call.status})
+            results.append(result)
+            print(f"  {result['name']:<50} p50 {result['p50_ms']:>9.2f} ms  p99 {result['p99_ms']:>9.2f} ms"
+                  f"  mem {result['peak_memory_kb']:>10.1f} KB  [{result['status']}]")
+    return results
+
+
+def benchmark_jobs(app, jobs: List[str], iterations: int) -> List[Dict]:
+    """
+    Mede os jobs do agendador contra a API local.
+    Os jobs tratam as próprias falhas e só as registram no log; por isso os
+    avisos e erros do agendador são capturados e gravados junto dos tempos.
+    """
+    from werkzeug.serving import make_server
+    from scheduler import OdontoSoftScheduler
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    scheduler_logger = logging.getLogger('scheduler')
+    scheduler_logger.setLevel(logging.WARNING)
+
+    api_server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=api_server.serve_forever, daemon=True).start()
+
+    job_scheduler = OdontoSoftScheduler(api_base_url=f'http://127.0.0.1:{api_server.server_port}')
+    job_scheduler.config['send_interval'] = 0
+
+    results = []
+    try:
+        for job in jobs:
+            capture = JobLogCapture()
+            scheduler_logger.addHandler(capture)
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    result = measure(lambda job=job: job_scheduler.force_run_job(job), iterations)
+            finally:
+                scheduler_logger.removeHandler(capture)
+            result.update({'name': job, 'status': 'error' if capture.messages else 'ok'})
+            if capture.messages:
+                result['error'] = capture.messages[0]
+            results.append(result)
+            print(f"  {job:<50} p50 {result['p50_ms']:>9.2f} ms  p99 {result['p99_ms']:>9.2f} ms"
+                  f"  mem {result['peak_memory_kb']:>10.1f} KB  [{result['status']}]")
+            if capture.messages:
+                print(f"    {capture.messages[0]}")
+    finally:
+        api_server.shutdown()
+    return results
+
+
+def _legacy_confirmation(name: str, start_time: str) -> str:
+    """Montagem anterior da confirmação (f-string, data convertida a cada mensagem), para comparação."""
+    appointment_datetime = datetime.fromisoformat(start_time)
+    formatted_date = appointment_datetime.strftime('%d/%m/%Y')
+    formatted_time = appointment_datetime.strftime('%H:%M')
+    return f"""🦷 *Confirmação de Consulta - Dentinhos de Leite*
+
+Olá {name}!
+
+Sua consulta está agendada para:
+📅 Data: {formatted_date}
+🕐 Horário: {formatted_time}
+
+Por favor, confirme sua presença respondendo:
+✅ *SIM* - para confirmar
+❌ *NÃO* - para cancelar
+🔄 *REAGENDAR* - para remarcar
+
+Aguardamos sua confirmação! 😊"""
+
+
+def benchmark_templates(renders: int) -> List[Dict]:
+    """
+    Custo por mensagem de confirmação em `renders` renderizações: montagem antiga,
+    registro de templates mensagem a mensagem e renderização em lote.
+    Os horários se repetem como em um dia real de agenda (slots de 30 minutos).
+    """
+    from message_templates import TemplateRegistry, format_appointment_datetime
+
+    registry = TemplateRegistry()
+    slots = [(datetime(2030, 1, 7, 8) + timedelta(days=d, minutes=30 * s)).isoformat()
+             for d in range(20) for s in range(20)]
+    recipients = [{'name': f'Responsável {i}', 'start_time': slots[i % len(slots)]} for i in range(renders)]
+
+    def legacy():
+        return [_legacy_confirmation(r['name'], r['start_time']) for r in recipients]
+
+    def per_message():
+        messages = []
+        for r in recipients:
+            date, time_of_day = format_appointment_datetime(r['start_time'])
+            messages.append(registry.render('confirmation', {'name': r['name'], 'date': date, 'time': time_of_day}))
+        return messages
+
+    def batch():
+        return registry.render_batch('confirmation', recipients)
+
+    assert legacy()[:len(slots)] == batch()[:len(slots)], 'templates divergentes da montagem anterior'
+
+    results = []
+    for name, func in (('legacy_fstring', legacy), ('registry_render', per_message), ('registry_batch', batch)):
+        timings = []
+        for _ in range(3):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        result = {
+            'name': name,
+            'renders': renders,
+            'total_ms': round(best * 1000, 2),
+            'per_message_us': round(best / renders * 1e6, 3),
+        }
+        results.append(result)
+        print(f"  {name:<50} {result['per_message_us']:>9.3f} µs/mensagem  total {result['total_ms']:>9.2f} ms")
+    return results
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Lista os itens cujo p50 piorou mais que `threshold` (fração) em relação à base."""
+    regressions = []
+    for section, metric in (('routes', 'p50_ms'), ('jobs', 'p50_ms'), ('templates', 'per_message_us')):
+        previous = {item['name']: item for item in baseline.get(section, [])}
+        for item in current.get(section, []):
+            old = previous.get(item['name'])
+            if not old or not old[metric]:
+                continue
+            change = (item[metric] - old[metric]) / old[metric]
+            if change > threshold:
+                regressions.append(
+                    f"{section}: {item['name']} {metric} {old[metric]:.2f} -> {item[metric]:.2f} (+{change:.0%})"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks do OdontoSoft')
+    parser.add_argument('--iterations', type=int, default=10, help='Repetições por rota/job')
+    parser.add_argument('--jobs', nargs='*', default=SCHEDULER_JOBS, choices=SCHEDULER_JOBS,
+                        help='Jobs do agendador a medir (vazio para nenhum)')
+    parser.add_argument('--template-renders', type=int, default=100_000,
+                        help='Mensagens no micro-benchmark de templates (0 para pular)')
+    parser.add_argument('--templates-only', action='store_true',
+                        help='Roda só o micro-benchmark de templates (sem banco)')
+    parser.add_argument('--label', help='Nome do arquivo de resultado (padrão: commit atual)')
+    parser.add_argument('--compare', help='Arquivo JSON de uma execução anterior para comparação')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Piora tolerada no p50 (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    if args.templates_only:
+        print("Templates de mensagens:")
+        benchmark_templates(args.template_renders)
+        return
+
+    # Logs de cada requisição poluiriam a saída; LOG_LEVEL=INFO mede também o custo deles
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    from app import app, db, Patient, Appointment, AppointmentSeries, Budget
+    from migrations import upgrade
+
+    with app.app_context():
+        upgrade(db.engine, db.metadata)
+        counts = {
+            'patients': db.session.query(db.func.count(Patient.id)).scalar(),
+            'appointments': db.session.query(db.func.count(Appointment.id)).scalar(),
+            'budgets': db.session.query(db.func.count(Budget.id)).scalar(),
+        }
+        if not counts['patients']:
+            parser.error('banco vazio: rode antes "python seed_data.py"')
+        first_series = AppointmentSeries.query.order_by(AppointmentSeries.id).first()
+        ctx = {
+            'patient_id': db.session.query(db.func.min(Patient.id)).scalar(),
+            'appointment_id': db.session.query(db.func.min(Appointment.id)).scalar() or 1,
+            'series_id': first_series.id if first_series else 1,
+            'series_start': first_series.dtstart.isoformat() if first_series else '2030-01-07T08:00:00',
+            'name': 'confirmation',  # template de PUT /message-templates/<name>
+        }
+        dialect = db.engine.dialect.name
+
+    print(f"Banco {dialect}: {counts}")
+    report = {
+        'label': args.label or git_revision() or datetime.now().strftime('%Y%m%d%H%M%S'),
+        'created_at': datetime.now().isoformat(),
+        'git_commit': git_revision(),
+        'python': platform.python_version(),
+        'database': {'dialect': dialect, **counts},
+        'iterations': args.iterations,
+    }
+
+    print("Rotas:")
+    report['routes'] = benchmark_routes(app, ctx, args.iterations)
+    if args.jobs:
+        print("Jobs do agendador:")
+        report['jobs'] = benchmark_jobs(app, args.jobs, args.iterations)
+    if args.template_renders:
+        print("Templates de mensagens:")
+        report['templates'] = benchmark_templates(args.template_renders)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output = os.path.join(RESULTS_DIR, f"{report['label']}.json")
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Resultados salvos em {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print("Regressões encontradas:")
+            for line in regressions:
+                print(f"  {line}")
+            raise SystemExit(1)
+        print("Nenhuma regressão acima do limite")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,17 @@
+import sys
+
 from app import db, app # Importa db e app do seu app.py
+from migrations import upgrade
 
 with app.app_context():
-    print("Tentando apagar todas as tabelas do banco de dados (se existirem)...")
-    db.drop_all() # Apaga todas as tabelas existentes
-    print("Tabelas apagadas.")
+    if '--reset' in sys.argv:
+        # Apaga TODOS os dados: use apenas em desenvolvimento
+        print("Tentando apagar todas as tabelas do banco de dados (se existirem)...")
+        db.drop_all() # Apaga todas as tabelas existentes
+        db.session.execute(db.text("DROP TABLE IF EXISTS schema_migrations"))
+        db.session.commit()
+        print("Tabelas apagadas.")
 
-    print("Tentando criar todas as tabelas do banco de dados...")
-    db.create_all() # Cria todas as tabelas definidas nos modelos
-    print("Tabelas criadas ou já existentes.")
+    print("Aplicando migrações do banco de dados...")
+    report = upgrade(db.engine, db.metadata) # Cria ou atualiza as tabelas sem apagar dados
+    print(f"Migrações aplicadas: {len(report)}. Banco de dados atualizado.")
@@ -0,0 +1,77 @@
+"""
+Roteamento de consultas entre o banco principal (escrita) e a réplica de leitura.
+
+Rotas marcadas com @read_only enviam seus SELECTs para a réplica configurada em
+READ_DATABASE_URL. Escritas sempre vão para o banco principal, e o cliente que
+acabou de gravar continua lendo do principal por alguns segundos
+(read-your-writes), até que a réplica alcance as alterações.
+
+O controle não depende de cookies (o frontend chama a API de outra origem):
+toda resposta a uma escrita traz o cabeçalho X-Last-Write com o horário da
+gravação, e o cliente o devolve nas requisições seguintes.
+"""
+
+import os
+import time
+from functools import wraps
+
+from flask import current_app, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql import Select
+
+REPLICA_BIND = 'replica'
+
+# Cabeçalho com o horário (epoch, segundos) da última escrita do cliente
+LAST_WRITE_HEADER = 'X-Last-Write'
+
+# Tempo (segundos) em que um cliente que gravou continua lendo do banco principal
+REPLICA_STICKY_SECONDS = float(os.environ.get("REPLICA_STICKY_SECONDS", 5))
+
+
+class RoutingSession(Session):
+    """Sessão que envia leituras para a réplica quando a rota permite."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and self.info.get('use_replica')
+            and not self.info.get('wrote')
+            and not self._flushing
+            and isinstance(clause, Select)
+            and REPLICA_BIND in self._db.engines
+        ):
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_session_wrote(db_session, flush_context):
+    # A partir daqui, as leituras desta sessão precisam ver a própria escrita
+    db_session.info['wrote'] = True
+
+
+def _last_write_at() -> float:
+    try:
+        return float(request.headers.get(LAST_WRITE_HEADER, 0))
+    except ValueError:
+        return 0.0
+
+
+def read_only(view):
+    """Marca uma rota como somente leitura, liberando o uso da réplica."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if time.time() - _last_write_at() > REPLICA_STICKY_SECONDS:
+            current_app.extensions['sqlalchemy'].session.info['use_replica'] = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def init_read_replica(app, db):
+    """Registra o controle de read-your-writes no app."""
+    @app.after_request
+    def remember_last_write(response):
+        if db.session.info.get('wrote'):
+            response.headers[LAST_WRITE_HEADER] = f'{time.time():.3f}'
+        return response
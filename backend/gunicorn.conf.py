@@ -0,0 +1,34 @@
+"""
+Configuração do gunicorn para produção.
+Todos os valores podem ser ajustados por variáveis de ambiente.
+"""
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# Processos: 2 x núcleos + 1 é um bom ponto de partida para uma API com banco
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+
+# Threads por worker: as requisições passam a maior parte do tempo esperando o banco
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+# Recicla workers periodicamente para conter vazamentos de memória
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = 100
+
+# Sem preload: cada worker abre o próprio pool de conexões depois do fork
+preload_app = False
+
+# Log de acesso do gunicorn desligado por padrão: seria uma linha síncrona, sem
+# amostragem e fora do JSON por requisição. O app já grava a sua (logger
+# odontosoft.access, ver logging_config.py). GUNICORN_ACCESS_LOG=- liga no console
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
@@ -0,0 +1,166 @@
+"""
+Teste de carga do OdontoSoft.
+Sobe o gunicorn com diferentes quantidades de workers e mede requisições por
+segundo e latência (p50/p99) dos principais endpoints.
+
+Uso:
+    python loadtest.py --workers 1 2 4 --duration 15 --concurrency 16
+    python loadtest.py --url http://localhost:5000   # servidor já em execução
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+import requests
+
+# Endpoints exercitados por padrão: (método, caminho, corpo)
+DEFAULT_ENDPOINTS = [
+    ('GET', '/', None),
+    ('GET', '/patients', None),
+    ('GET', '/appointments', None),
+    ('GET', '/budgets', None),
+    ('GET', '/automation/pending-confirmations', None),
+    ('POST', '/whatsapp/webhook', {'phone': '5511999999999', 'message': 'SIM', 'timestamp': '2025-01-01T09:00:00'}),
+]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil por posição mais próxima (values não precisa estar ordenada)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def wait_for_server(base_url: str, timeout: float = 30) -> bool:
+    """Aguarda o servidor responder em '/'."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{base_url}/", timeout=1).status_code == 200:
+                return True
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def run_endpoint(base_url: str, method: str, path: str, body: Optional[Dict],
+                 duration: float, concurrency: int) -> Dict:
+    """
+    Dispara requisições contra um endpoint durante `duration` segundos.
+
+    Returns:
+        Dict com total de requisições, erros, req/s e latências em ms
+    """
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        session = requests.Session()
+        local_latencies = []
+        local_errors = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                response = session.request(method, f"{base_url}{path}", json=body, timeout=30)
+                if response.status_code >= 400:
+                    local_errors += 1
+            except requests.exceptions.RequestException:
+                local_errors += 1
+            local_latencies.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        'endpoint': f"{method} {path}",
+        'requests': len(latencies),
+        'errors': errors[0],
+        'requests_per_second': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+    }
+
+
+def start_gunicorn(workers: int, port: int) -> subprocess.Popen:
+    """Sobe o gunicorn com a configuração de produção e `workers` processos."""
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), PORT=str(port))
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    return subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:application'],
+        cwd=backend_dir,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+
+
+def run_suite(base_url: str, endpoints, duration: float, concurrency: int) -> List[Dict]:
+    results = []
+    for method, path, body in endpoints:
+        result = run_endpoint(base_url, method, path, body, duration, concurrency)
+        results.append(result)
+        print(f"  {result['endpoint']:<42} {result['requests_per_second']:>9.1f} req/s"
+              f"  p50 {result['p50_ms']:>8.2f} ms  p99 {result['p99_ms']:>8.2f} ms"
+              f"  erros {result['errors']}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Teste de carga do OdontoSoft')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4],
+                        help='Quantidades de workers do gunicorn a testar')
+    parser.add_argument('--url', help='Testa um servidor já em execução em vez de subir o gunicorn')
+    parser.add_argument('--port', type=int, default=5055, help='Porta usada pelo gunicorn do teste')
+    parser.add_argument('--duration', type=float, default=10, help='Segundos por endpoint')
+    parser.add_argument('--concurrency', type=int, default=16, help='Clientes simultâneos')
+    parser.add_argument('--output', help='Arquivo JSON para salvar os resultados')
+    args = parser.parse_args()
+
+    report = {'duration': args.duration, 'concurrency': args.concurrency, 'runs': []}
+
+    if args.url:
+        print(f"Servidor: {args.url}")
+        results = run_suite(args.url, DEFAULT_ENDPOINTS, args.duration, args.concurrency)
+        report['runs'].append({'workers': None, 'results': results})
+    else:
+        base_url = f"http://127.0.0.1:{args.port}"
+        for workers in args.workers:
+            print(f"gunicorn com {workers} worker(s)")
+            process = start_gunicorn(workers, args.port)
+            try:
+                if not wait_for_server(base_url):
+                    print("  servidor não respondeu, pulando")
+                    continue
+                results = run_suite(base_url, DEFAULT_ENDPOINTS, args.duration, args.concurrency)
+                report['runs'].append({'workers': workers, 'results': results})
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Resultados salvos em {args.output}")
+
+
+if __name__ == '__main__':
+    main()
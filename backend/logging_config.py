@@ -0,0 +1,249 @@
+"""
+Configuração de logs do OdontoSoft (API, agendador e integração com o WhatsApp).
+
+- Quem gera o log só enfileira o registro (QueueHandler); a escrita em disco e
+  no console acontece em uma thread separada (QueueListener), sem bloquear
+  requisições nem o loop de lembretes.
+- Cada linha é um JSON com data, nível, logger, mensagem, request_id/job_id e
+  os campos passados em `extra`.
+- O arquivo gira por tamanho (LOG_MAX_BYTES) ou por horário (LOG_ROTATE_WHEN,
+  ex.: "midnight"), mantendo LOG_BACKUP_COUNT arquivos.
+- Linhas repetidas a cada mensagem usam loggers amostrados (sampled_logger):
+  apenas uma a cada N é gravada; avisos e erros sempre passam.
+
+Variáveis de ambiente: LOG_LEVEL, LOG_FILE, LOG_MAX_BYTES, LOG_BACKUP_COUNT,
+LOG_ROTATE_WHEN, LOG_FORMAT (json ou text, para o console), LOG_SAMPLE_RATE.
+"""
+
+import atexit
+import contextvars
+import functools
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('request_id', default=None)
+job_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('job_id', default=None)
+
+LOG_MAX_BYTES = int(os.environ.get("LOG_MAX_BYTES", 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.environ.get("LOG_BACKUP_COUNT", 5))
+LOG_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", 0.1))
+
+# Atributos padrão de um LogRecord; o que sobrar veio de `extra`
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def new_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+class JsonFormatter(logging.Formatter):
+    """Uma linha JSON por registro."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'timestamp': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _ContextQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enfileira o registro já com request_id/job_id da thread de origem.
+    A exceção vira texto aqui, pois o traceback não pode ir para outra thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(record.__dict__)
+        record.request_id = getattr(record, 'request_id', None) or request_id_var.get()
+        record.job_id = getattr(record, 'job_id', None) or job_id_var.get()
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class SamplingFilter(logging.Filter):
+    """Deixa passar um a cada N registros abaixo de WARNING."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = max(min(rate, 1.0), 0.0)
+        self.every = round(1 / self.rate) if self.rate else 0
+        self._counter = itertools.count()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.every == 1:
+            return True
+        if not self.every or next(self._counter) % self.every:
+            return False
+        record.sample_rate = self.rate
+        return True
+
+
+def sampled_logger(name: str, rate: Optional[float] = None) -> logging.Logger:
+    """
+    Logger para linhas de alto volume (uma por mensagem ou paciente).
+
+    Args:
+        name: Nome do logger
+        rate: Fração gravada (padrão LOG_SAMPLE_RATE); 1 grava tudo
+    """
+    logger = logging.getLogger(name)
+    if not any(isinstance(f, SamplingFilter) for f in logger.filters):
+        logger.addFilter(SamplingFilter(LOG_SAMPLE_RATE if rate is None else rate))
+    return logger
+
+
+def _file_handler(log_file: str) -> logging.Handler:
+    when = os.environ.get("LOG_ROTATE_WHEN")
+    if when:
+        return logging.handlers.TimedRotatingFileHandler(
+            log_file, when=when, backupCount=LOG_BACKUP_COUNT, encoding='utf-8'
+        )
+    return logging.handlers.RotatingFileHandler(
+        log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8'
+    )
+
+
+def setup_logging(service: str, log_file: Optional[str] = None,
+                  level: Optional[str] = None) -> logging.handlers.QueueListener:
+    """
+    Configura o logger raiz do processo. Chamadas seguintes não mudam nada.
+
+    Args:
+        service: Nome do serviço gravado em cada linha (app, scheduler...)
+        log_file: Arquivo de log; LOG_FILE tem prioridade. Sem arquivo, só console
+        level: Nível mínimo; LOG_LEVEL tem prioridade (padrão INFO)
+
+    Returns:
+        O QueueListener que grava os registros
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    console = logging.StreamHandler()
+    if os.environ.get("LOG_FORMAT", "json") == "text":
+        console.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    else:
+        console.setFormatter(JsonFormatter())
+    handlers = [console]
+
+    log_file = os.environ.get("LOG_FILE", log_file)
+    if log_file:
+        file_handler = _file_handler(log_file)
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _ContextQueueHandler(log_queue)
+    # O nome do serviço entra em todos os registros, inclusive os de bibliotecas
+    queue_handler.addFilter(lambda record: setattr(record, 'service', service) or True)
+
+    root = logging.getLogger()
+    root.setLevel(os.environ.get("LOG_LEVEL", level or "INFO").upper())
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    # Grava o que ainda estiver na fila ao encerrar o processo
+    atexit.register(_listener.stop)
+    return _listener
+
+
+@contextmanager
+def job_context(job_name: str, job_id: Optional[str] = None):
+    """Associa um job_id aos registros gerados dentro do bloco."""
+    token = job_id_var.set(job_id or f"{job_name}-{new_id()}")
+    try:
+        yield job_id_var.get()
+    finally:
+        job_id_var.reset(token)
+
+
+def logged_job(job_name: str) -> Callable:
+    """Decorator dos jobs do agendador: job_id próprio e duração no log."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            logger = logging.getLogger(func.__module__)
+            with job_context(job_name):
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    logger.info(f"Job {job_name} finalizado", extra={
+                        'job': job_name,
+                        'duration_ms': round((time.perf_counter() - started) * 1000, 1)
+                    })
+        return wrapper
+    return decorator
+
+
+def init_request_logging(app):
+    """
+    Gera um request_id por requisição (ou usa o X-Request-ID recebido),
+    devolve-o no cabeçalho da resposta e grava uma linha amostrada por requisição.
+    O agendador envia X-Job-ID, que liga as linhas da API ao job que as causou.
+    """
+    from flask import g, request
+
+    access_logger = sampled_logger('odontosoft.access')
+
+    @app.before_request
+    def _start_request_log():
+        g.log_tokens = (
+            request_id_var.set(request.headers.get('X-Request-ID') or new_id()),
+            job_id_var.set(request.headers.get('X-Job-ID')),
+        )
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def _finish_request_log(response):
+        request_id = request_id_var.get()
+        if request_id:
+            response.headers['X-Request-ID'] = request_id
+        if 'request_started' in g:
+            access_logger.log(
+                logging.WARNING if response.status_code >= 500 else logging.INFO,
+                f"{request.method} {request.path} {response.status_code}",
+                extra={
+                    'method': request.method,
+                    'path': request.path,
+                    'status': response.status_code,
+                    'duration_ms': round((time.perf_counter() - g.request_started) * 1000, 1)
+                }
+            )
+        return response
+
+    @app.teardown_request
+    def _clear_request_log(exc):
+        tokens = g.pop('log_tokens', None)
+        if tokens:
+            request_id_var.reset(tokens[0])
+            job_id_var.reset(tokens[1])
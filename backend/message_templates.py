@@ -0,0 +1,314 @@
+"""
+Modelos (templates) das mensagens de WhatsApp do OdontoSoft.
+
+Cada template é compilado uma única vez e guardado em cache por
+(clínica, template, idioma). As clínicas podem sobrescrever os textos padrão
+(tabela message_template, carregada periodicamente do banco). Datas e horários
+são convertidos e formatados uma vez por valor distinto, o que barateia o
+envio em lote, em que muitos pacientes compartilham os mesmos horários.
+
+Os textos usam o formato de campos do str.format: {name}, {date}, {time}...
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+from functools import lru_cache
+from string import Formatter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCALE = 'pt_BR'
+
+# Formatos de data e hora por idioma
+LOCALE_FORMATS: Dict[str, Dict[str, str]] = {
+    'pt_BR': {'date': '%d/%m/%Y', 'time': '%H:%M'},
+    'es': {'date': '%d/%m/%Y', 'time': '%H:%M'},
+    'en': {'date': '%m/%d/%Y', 'time': '%I:%M %p'},
+}
+
+# Campos aceitos por template (validados ao salvar uma personalização)
+TEMPLATE_FIELDS: Dict[str, Tuple[str, ...]] = {
+    'confirmation': ('name', 'date', 'time'),
+    'return_reminder': ('name', 'return_type'),
+    'post_appointment': ('name',),
+}
+
+DEFAULT_TEMPLATES: Dict[Tuple[str, str], str] = {
+    ('confirmation', 'pt_BR'): """🦷 *Confirmação de Consulta - Dentinhos de Leite*
+
+Olá {name}!
+
+Sua consulta está agendada para:
+📅 Data: {date}
+🕐 Horário: {time}
+
+Por favor, confirme sua presença respondendo:
+✅ *SIM* - para confirmar
+❌ *NÃO* - para cancelar
+🔄 *REAGENDAR* - para remarcar
+
+Aguardamos sua confirmação! 😊""",
+
+    ('return_reminder', 'pt_BR'): """🦷 *Lembrete de Retorno - Dentinhos de Leite*
+
+Olá {name}!
+
+É hora do retorno para {return_type}!
+
+Para agendar sua consulta:
+📞 Entre em contato conosco
+💬 Responda esta mensagem
+🌐 Acesse nosso site
+
+Cuidar dos dentinhos é muito importante! 😊""",
+
+    ('post_appointment', 'pt_BR'): """🦷 *Orientações Pós-Consulta - Dentinhos de Leite*
+
+Olá {name}!
+
+Seguem as orientações importantes para o cuidado após a consulta.
+
+Por favor, leia com atenção e siga as recomendações.
+
+Qualquer dúvida, estamos à disposição! 😊""",
+
+    ('confirmation', 'es'): """🦷 *Confirmación de Consulta - Dentinhos de Leite*
+
+¡Hola {name}!
+
+Su consulta está programada para:
+📅 Fecha: {date}
+🕐 Hora: {time}
+
+Por favor, confirme su asistencia respondiendo:
+✅ *SÍ* - para confirmar
+❌ *NO* - para cancelar
+🔄 *REPROGRAMAR* - para cambiar la fecha
+
+¡Esperamos su confirmación! 😊""",
+
+    ('return_reminder', 'es'): """🦷 *Recordatorio de Regreso - Dentinhos de Leite*
+
+¡Hola {name}!
+
+¡Es hora de volver para {return_type}!
+
+Para programar su consulta:
+📞 Contáctenos
+💬 Responda este mensaje
+🌐 Visite nuestro sitio
+
+¡Cuidar los dientes de leche es muy importante! 😊""",
+
+    ('post_appointment', 'es'): """🦷 *Orientaciones Post-Consulta - Dentinhos de Leite*
+
+¡Hola {name}!
+
+Estas son las orientaciones importantes para el cuidado después de la consulta.
+
+Por favor, léalas con atención y siga las recomendaciones.
+
+¡Cualquier duda, estamos a su disposición! 😊""",
+
+    ('confirmation', 'en'): """🦷 *Appointment Confirmation - Dentinhos de Leite*
+
+Hello {name}!
+
+Your appointment is scheduled for:
+📅 Date: {date}
+🕐 Time: {time}
+
+Please confirm by replying:
+✅ *YES* - to confirm
+❌ *NO* - to cancel
+🔄 *RESCHEDULE* - to reschedule
+
+We look forward to your confirmation! 😊""",
+
+    ('return_reminder', 'en'): """🦷 *Return Visit Reminder - Dentinhos de Leite*
+
+Hello {name}!
+
+It's time to come back for {return_type}!
+
+To book your appointment:
+📞 Get in touch with us
+💬 Reply to this message
+🌐 Visit our website
+
+Taking care of baby teeth is very important! 😊""",
+
+    ('post_appointment', 'en'): """🦷 *Post-Appointment Care - Dentinhos de Leite*
+
+Hello {name}!
+
+Here are the important care instructions for after the appointment.
+
+Please read them carefully and follow the recommendations.
+
+If you have any questions, we are here to help! 😊""",
+}
+
+
+class CompiledTemplate:
+    """Template convertido para formatação com % (feita em C, sem reanalisar o texto)."""
+    __slots__ = ('source', 'fields', '_format')
+
+    def __init__(self, source: str):
+        parts = []
+        fields = []
+        for literal, field, format_spec, conversion in Formatter().parse(source):
+            parts.append(literal.replace('%', '%%'))
+            if field is not None:
+                if not field.isidentifier() or format_spec or conversion:
+                    raise ValueError(f"Campo inválido no template: {{{field}}}")
+                parts.append(f'%({field})s')
+                fields.append(field)
+        self.source = source
+        self.fields = tuple(fields)
+        self._format = ''.join(parts)
+
+    def render(self, values: Dict) -> str:
+        return self._format % values
+
+
+@lru_cache(maxsize=4096)
+def _parse_datetime(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+
+@lru_cache(maxsize=4096)
+def _format_datetime(value: datetime, locale: str) -> Tuple[str, str]:
+    formats = LOCALE_FORMATS.get(locale, LOCALE_FORMATS[DEFAULT_LOCALE])
+    return value.strftime(formats['date']), value.strftime(formats['time'])
+
+
+def format_appointment_datetime(value: Union[str, datetime], locale: str = DEFAULT_LOCALE) -> Tuple[str, str]:
+    """
+    Formata data e hora de uma consulta no padrão do idioma.
+    Valores repetidos (mesmo horário para vários pacientes) saem do cache.
+
+    Returns:
+        Tupla (data, hora) já formatadas
+    """
+    if isinstance(value, str):
+        value = _parse_datetime(value)
+    return _format_datetime(value, locale)
+
+
+class TemplateRegistry:
+    def __init__(self, defaults: Optional[Dict[Tuple[str, str], str]] = None,
+                 default_locale: str = DEFAULT_LOCALE, reload_interval: float = 60.0):
+        """
+        Registro de templates com cache dos templates compilados.
+
+        Args:
+            defaults: Textos padrão por (template, idioma)
+            default_locale: Idioma usado quando não há texto para o idioma pedido
+            reload_interval: Segundos entre recargas das personalizações das clínicas
+        """
+        self._defaults = dict(defaults or DEFAULT_TEMPLATES)
+        self.default_locale = default_locale
+        self.reload_interval = reload_interval
+        self._overrides: Dict[Tuple[Optional[int], str, str], str] = {}
+        self._cache: Dict[Tuple[Optional[int], str, str], CompiledTemplate] = {}
+        self._lock = threading.Lock()
+        self._loader: Optional[Callable[[], Iterable[Tuple[Optional[int], str, str, str]]]] = None
+        self._loaded_at = 0.0
+
+    def set_loader(self, loader: Callable[[], Iterable[Tuple[Optional[int], str, str, str]]]):
+        """
+        Define a função que lê as personalizações do banco.
+        Ela deve devolver tuplas (clinic_id, template, idioma, texto).
+        """
+        self._loader = loader
+        self._loaded_at = 0.0
+
+    def _reload_if_stale(self):
+        if self._loader is None or time.monotonic() - self._loaded_at < self.reload_interval:
+            return
+        with self._lock:
+            if time.monotonic() - self._loaded_at < self.reload_interval:
+                return
+            self._loaded_at = time.monotonic()
+            try:
+                rows = list(self._loader())
+            except Exception as e:
+                logger.error(f"Erro ao carregar templates personalizados: {e}")
+                return
+            self._overrides = {(clinic_id, name, locale): body for clinic_id, name, locale, body in rows}
+            self._cache = {}
+
+    def set_override(self, name: str, locale: str, body: str, clinic_id: Optional[int] = None):
+        """Registra a personalização de uma clínica e invalida o cache desse template."""
+        CompiledTemplate(body)  # valida antes de aceitar
+        with self._lock:
+            self._overrides[(clinic_id, name, locale)] = body
+            self._cache = {key: value for key, value in self._cache.items() if key[1] != name}
+
+    def get(self, name: str, locale: Optional[str] = None, clinic_id: Optional[int] = None) -> CompiledTemplate:
+        """
+        Template compilado, na ordem: personalização da clínica, personalização
+        da instalação (clinic_id vazio), padrão do idioma, padrão geral.
+        """
+        self._reload_if_stale()
+        locale = locale or self.default_locale
+        key = (clinic_id, name, locale)
+        compiled = self._cache.get(key)
+        if compiled is not None:
+            return compiled
+
+        source = (
+            self._overrides.get((clinic_id, name, locale))
+            or self._overrides.get((None, name, locale))
+            or self._defaults.get((name, locale))
+            or self._defaults.get((name, self.default_locale))
+        )
+        if source is None:
+            raise KeyError(f"Template não encontrado: {name}")
+        compiled = CompiledTemplate(source)
+        self._cache[key] = compiled
+        return compiled
+
+    def render(self, name: str, values: Dict, locale: Optional[str] = None,
+               clinic_id: Optional[int] = None) -> str:
+        return self.get(name, locale, clinic_id).render(values)
+
+    def render_batch(self, name: str, recipients: Iterable[Dict], locale: Optional[str] = None,
+                     clinic_id: Optional[int] = None) -> List[str]:
+        """
+        Renderiza o mesmo template para vários destinatários.
+
+        Se o destinatário tiver 'start_time' (datetime ou ISO), os campos date e
+        time são preenchidos a partir dele.
+        """
+        locale = locale or self.default_locale
+        template = self.get(name, locale, clinic_id)
+        messages = []
+        for values in recipients:
+            start_time = values.get('start_time')
+            if start_time is not None and 'date' not in values:
+                date, time_of_day = format_appointment_datetime(start_time, locale)
+                values = dict(values, date=date, time=time_of_day)
+            messages.append(template.render(values))
+        return messages
+
+
+def validate_template(name: str, body: str):
+    """Valida uma personalização: sintaxe e campos permitidos para o template."""
+    if name not in TEMPLATE_FIELDS:
+        raise ValueError(f"Template desconhecido: {name}")
+    compiled = CompiledTemplate(body)
+    unknown = set(compiled.fields) - set(TEMPLATE_FIELDS[name])
+    if unknown:
+        raise ValueError(
+            f"Campos não permitidos em {name}: {', '.join(sorted(unknown))}. "
+            f"Use apenas: {', '.join(TEMPLATE_FIELDS[name])}"
+        )
+
+
+# Instância global para uso na aplicação
+templates = TemplateRegistry()
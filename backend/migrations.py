@@ -0,0 +1,570 @@
+"""
+Sistema de migrações versionadas do OdontoSoft.
+Aplica alterações de esquema sem tirar a clínica do ar: índices são criados de
+forma online (CONCURRENTLY no PostgreSQL), colunas derivadas são preenchidas em
+lotes curtos e o tempo de cada etapa é registrado.
+
+Migrações de contração (que removem colunas ou exigem NOT NULL) quebrariam
+os workers da versão anterior que ainda estão no ar durante o deploy. Por isso
+só são aplicadas com --contract, depois que a nova versão estiver rodando em
+todos os workers (em um banco novo elas são aplicadas direto).
+
+Uso:
+    python migrations.py                    # aplica as migrações de expansão pendentes
+    python migrations.py upgrade --contract # após o deploy: aplica também as de contração
+    python migrations.py status             # lista as migrações aplicadas e pendentes
+"""
+
+import argparse
+import logging
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, text
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+logger = logging.getLogger(__name__)
+
+# Tabela de controle das versões aplicadas (fora do db.metadata dos modelos)
+_version_metadata = MetaData()
+schema_migrations = Table(
+    'schema_migrations',
+    _version_metadata,
+    Column('version', Integer, primary_key=True),
+    Column('name', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+    Column('duration_ms', Integer, nullable=False),
+)
+
+MIGRATIONS: List['Migration'] = []
+
+
+class Migration:
+    def __init__(self, version: int, name: str, func: Callable[['MigrationContext'], None],
+                 contract: bool = False):
+        self.version = version
+        self.name = name
+        self.func = func
+        self.contract = contract
+
+    def __repr__(self):
+        return f'<Migration {self.version:04d} {self.name}>'
+
+
+def migration(version: int, name: str, contract: bool = False):
+    """
+    Registra uma função como migração.
+
+    Cada etapa de uma migração é confirmada separadamente (para não segurar
+    bloqueios longos), portanto as migrações devem ser idempotentes: se forem
+    interrompidas, podem ser executadas novamente do início.
+
+    Args:
+        version: Número sequencial e único da migração
+        name: Descrição curta da migração
+        contract: Remove estruturas ainda usadas pela versão anterior do código;
+            só é aplicada com upgrade(contract=True)
+    """
+    def decorator(func):
+        if any(m.version == version for m in MIGRATIONS):
+            raise ValueError(f"Migração {version} registrada em duplicidade")
+        MIGRATIONS.append(Migration(version, name, func, contract))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return func
+    return decorator
+
+
+class MigrationContext:
+    def __init__(self, engine, metadata=None, batch_size: int = 5000, batch_pause: float = 0.0):
+        """
+        Contexto entregue a cada migração, com operações seguras para produção.
+
+        Args:
+            engine: Engine SQLAlchemy do banco principal (escrita)
+            metadata: MetaData dos modelos (db.metadata)
+            batch_size: Quantidade de linhas por lote nos preenchimentos
+            batch_pause: Pausa em segundos entre lotes, para aliviar o banco
+        """
+        self.engine = engine
+        self.metadata = metadata
+        self.dialect = engine.dialect.name
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.steps: List[Dict] = []
+
+    @contextmanager
+    def step(self, description: str):
+        """Mede e registra o tempo de uma etapa da migração."""
+        logger.info(f"  -> {description}")
+        start = time.perf_counter()
+        yield
+        duration_ms = int((time.perf_counter() - start) * 1000)
+        self.steps.append({'step': description, 'duration_ms': duration_ms})
+        logger.info(f"     concluído em {duration_ms} ms")
+
+    # Inspeção do esquema
+
+    def has_table(self, table: str) -> bool:
+        return inspect(self.engine).has_table(table)
+
+    def has_column(self, table: str, column: str) -> bool:
+        if not self.has_table(table):
+            return False
+        return any(c['name'] == column for c in inspect(self.engine).get_columns(table))
+
+    def is_nullable(self, table: str, column: str) -> bool:
+        return any(c['name'] == column and c['nullable'] for c in inspect(self.engine).get_columns(table))
+
+    def has_index(self, table: str, name: str) -> bool:
+        if not self.has_table(table):
+            return False
+        return any(i['name'] == name for i in inspect(self.engine).get_indexes(table))
+
+    # Operações
+
+    def execute(self, sql: str, params: Optional[Dict] = None):
+        """Executa um comando SQL em uma transação própria."""
+        with self.step(sql if len(sql) <= 80 else sql[:77] + '...'):
+            with self.engine.begin() as conn:
+                conn.execute(text(sql), params or {})
+
+    def create_tables(self, metadata, tables: Optional[List[str]] = None):
+        """Cria as tabelas que ainda não existem (nunca apaga dados)."""
+        selected = [metadata.tables[name] for name in tables] if tables else None
+        label = ', '.join(tables) if tables else 'todas as tabelas'
+        with self.step(f"criar tabelas ausentes ({label})"):
+            metadata.create_all(bind=self.engine, tables=selected, checkfirst=True)
+
+    def create_index(self, name: str, table: str, columns: List[str], unique: bool = False):
+        """
+        Cria um índice sem bloquear escritas.
+
+        No PostgreSQL usa CREATE INDEX CONCURRENTLY fora de transação, removendo
+        antes um índice inválido deixado por uma execução interrompida. No SQLite
+        cada índice é criado em uma transação curta e isolada, liberando o banco
+        para as gravações da recepção entre um índice e outro.
+        """
+        unique_sql = 'UNIQUE ' if unique else ''
+        column_sql = ', '.join(columns)
+
+        with self.step(f"criar índice {name} em {table} ({column_sql})"):
+            if self.dialect == 'postgresql':
+                with self.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                    invalid = conn.execute(text(
+                        "SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+                        "WHERE c.relname = :name AND NOT i.indisvalid"
+                    ), {'name': name}).first()
+                    if invalid:
+                        logger.warning(f"     índice inválido {name} encontrado, recriando")
+                        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+                    conn.execute(text(
+                        f"CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({column_sql})"
+                    ))
+            else:
+                with self.engine.begin() as conn:
+                    conn.execute(text(
+                        f"CREATE {unique_sql}INDEX IF NOT EXISTS {name} ON {table} ({column_sql})"
+                    ))
+
+    def drop_index(self, name: str, table: str):
+        """Remove um índice, também de forma online no PostgreSQL."""
+        with self.step(f"remover índice {name}"):
+            if self.dialect == 'postgresql':
+                with self.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                    conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+            elif self.has_index(table, name):
+                with self.engine.begin() as conn:
+                    conn.execute(text(f"DROP INDEX {name}"))
+
+    def add_column(self, table: str, column: str, type_sql: str):
+        """
+        Adiciona uma coluna anulável, se ainda não existir.
+
+        Colunas anuláveis e sem valor padrão são alterações apenas de catálogo
+        tanto no PostgreSQL quanto no SQLite, sem reescrever a tabela.
+        """
+        with self.step(f"adicionar coluna {table}.{column} ({type_sql})"):
+            if not self.has_column(table, column):
+                with self.engine.begin() as conn:
+                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {type_sql}"))
+
+    def drop_column(self, table: str, column: str):
+        """
+        Remove uma coluna, se existir.
+
+        No PostgreSQL a remoção é apenas de catálogo. No SQLite (3.35+) a coluna
+        não pode fazer parte de um índice: remova os índices antes.
+        """
+        with self.step(f"remover coluna {table}.{column}"):
+            if self.has_column(table, column):
+                with self.engine.begin() as conn:
+                    conn.execute(text(f"ALTER TABLE {table} DROP COLUMN {column}"))
+
+    def drop_not_null(self, table: str, column: str):
+        """Torna a coluna anulável, se ainda não for."""
+        with self.step(f"permitir nulos em {table}.{column}"):
+            if not self.has_column(table, column) or self.is_nullable(table, column):
+                return
+            if self.dialect == 'postgresql':
+                with self.engine.begin() as conn:
+                    conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} DROP NOT NULL"))
+            else:
+                self._rebuild_sqlite_table(table, {column: True})
+
+    def set_not_null(self, table: str, column: str):
+        """
+        Exige valor na coluna, se ainda não exigir. Preencha os nulos antes.
+
+        No PostgreSQL a verificação é feita por um CHECK NOT VALID validado à
+        parte (sem bloquear escritas); o SET NOT NULL seguinte aproveita a
+        validação e não percorre a tabela de novo. O SQLite não altera colunas:
+        a tabela é recriada em uma única transação.
+        """
+        with self.step(f"exigir valor em {table}.{column}"):
+            if not self.has_column(table, column) or not self.is_nullable(table, column):
+                return
+            if self.dialect == 'postgresql':
+                constraint = f"{table}_{column}_not_null"
+                for sql in (
+                    f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {constraint}",
+                    f"ALTER TABLE {table} ADD CONSTRAINT {constraint} CHECK ({column} IS NOT NULL) NOT VALID",
+                    f"ALTER TABLE {table} VALIDATE CONSTRAINT {constraint}",
+                    f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL",
+                    f"ALTER TABLE {table} DROP CONSTRAINT {constraint}",
+                ):
+                    with self.engine.begin() as conn:
+                        conn.execute(text(sql))
+            else:
+                self._rebuild_sqlite_table(table, {column: False})
+
+    def _rebuild_sqlite_table(self, table: str, nullable: Dict[str, bool]):
+        """
+        Recria uma tabela do SQLite com a nulidade de algumas colunas alterada,
+        mantendo as demais colunas, chaves, índices e dados (copiados em uma
+        única transação).
+        """
+        reflected = MetaData()
+        old = Table(table, reflected, autoload_with=self.engine)
+        target = MetaData()
+        # As tabelas referenciadas só entram para resolver as chaves estrangeiras
+        for fk in old.foreign_keys:
+            if fk.column.table.name not in target.tables:
+                fk.column.table.to_metadata(target)
+        new = old.to_metadata(target)
+        for column, value in nullable.items():
+            new.c[column].nullable = value
+
+        columns = ', '.join(c.name for c in old.columns)
+        statements = [f"ALTER TABLE {table} RENAME TO {table}__old"]
+        statements += [f"DROP INDEX {index.name}" for index in old.indexes]
+        statements.append(str(CreateTable(new).compile(dialect=self.engine.dialect)))
+        statements += [str(CreateIndex(index).compile(dialect=self.engine.dialect)) for index in new.indexes]
+        statements += [
+            f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {table}__old",
+            f"DROP TABLE {table}__old",
+        ]
+
+        # DDL do sqlite3 fica fora de transação por padrão: controla a transação manualmente
+        raw = self.engine.raw_connection()
+        dbapi_connection = raw.driver_connection
+        previous_isolation = dbapi_connection.isolation_level
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            for sql in statements:
+                cursor.execute(sql)
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        finally:
+            dbapi_connection.isolation_level = previous_isolation
+            raw.close()
+
+    def backfill(self, table: str, assignments: str, where: str = '1 = 1',
+                 params: Optional[Dict] = None) -> int:
+        """
+        Preenche colunas derivadas em lotes por faixa de chave primária.
+
+        Cada lote é uma transação curta, então as escritas concorrentes nunca
+        esperam mais do que o tempo de um lote.
+
+        Args:
+            table: Tabela a atualizar (deve ter a coluna id)
+            assignments: Trecho SET do UPDATE, ex: "valor_centavos = ROUND(valor * 100)"
+            where: Condição adicional, ex: "valor_centavos IS NULL"
+            params: Parâmetros nomeados usados em assignments/where
+
+        Returns:
+            Quantidade de linhas atualizadas
+        """
+        updated = 0
+        with self.step(f"preencher {table}: {assignments}"):
+            with self.engine.connect() as conn:
+                low, high = conn.execute(text(f"SELECT MIN(id), MAX(id) FROM {table}")).one()
+            if low is None:
+                return 0
+
+            batches = 0
+            for batch_start in range(low, high + 1, self.batch_size):
+                batch_params = dict(params or {})
+                batch_params.update({'_lo': batch_start, '_hi': batch_start + self.batch_size})
+                with self.engine.begin() as conn:
+                    result = conn.execute(text(
+                        f"UPDATE {table} SET {assignments} "
+                        f"WHERE id >= :_lo AND id < :_hi AND ({where})"
+                    ), batch_params)
+                    updated += result.rowcount
+                batches += 1
+                if self.batch_pause:
+                    time.sleep(self.batch_pause)
+            logger.info(f"     {updated} linhas atualizadas em {batches} lotes")
+        return updated
+
+
+# Execução
+
+def get_applied_versions(engine) -> Dict[int, Dict]:
+    """Retorna as migrações já aplicadas, indexadas pela versão."""
+    _version_metadata.create_all(bind=engine, checkfirst=True)
+    with engine.connect() as conn:
+        rows = conn.execute(schema_migrations.select().order_by(schema_migrations.c.version)).mappings()
+        return {row['version']: dict(row) for row in rows}
+
+
+def upgrade(engine=None, metadata=None, target: Optional[int] = None, batch_size: int = 5000,
+            batch_pause: float = 0.0, contract: Optional[bool] = None) -> List[Dict]:
+    """
+    Aplica as migrações pendentes, em ordem.
+
+    Args:
+        engine: Engine do banco (padrão: engine principal do app)
+        metadata: MetaData dos modelos (padrão: db.metadata do app)
+        target: Última versão a aplicar (padrão: todas)
+        batch_size: Linhas por lote nos preenchimentos
+        batch_pause: Pausa entre lotes, em segundos
+        contract: Aplica também as migrações de contração. Use só depois que a
+            nova versão estiver no ar; o padrão aplica apenas em bancos novos
+
+    Returns:
+        Relatório com a duração de cada migração e de cada etapa
+    """
+    if engine is None or metadata is None:
+        from app import app, db
+        with app.app_context():
+            engine = engine or db.engine
+        metadata = metadata or db.metadata
+
+    if contract is None:
+        # Banco novo: não há código antigo lendo ou gravando as estruturas removidas
+        contract = not inspect(engine).has_table('appointment')
+
+    applied = get_applied_versions(engine)
+    report = []
+
+    for m in MIGRATIONS:
+        if m.version in applied or (target is not None and m.version > target):
+            continue
+        if m.contract and not contract:
+            logger.info(f"Migração de contração {m.version:04d} adiada: aplique com --contract "
+                        f"depois que todos os workers estiverem na nova versão")
+            continue
+
+        logger.info(f"Aplicando migração {m.version:04d}: {m.name}")
+        ctx = MigrationContext(engine, metadata, batch_size=batch_size, batch_pause=batch_pause)
+        start = time.perf_counter()
+        m.func(ctx)
+        duration_ms = int((time.perf_counter() - start) * 1000)
+
+        with engine.begin() as conn:
+            conn.execute(schema_migrations.insert().values(
+                version=m.version,
+                name=m.name,
+                applied_at=datetime.utcnow(),
+                duration_ms=duration_ms
+            ))
+        logger.info(f"Migração {m.version:04d} aplicada em {duration_ms} ms")
+        report.append({
+            'version': m.version,
+            'name': m.name,
+            'duration_ms': duration_ms,
+            'steps': ctx.steps
+        })
+
+    if not report:
+        logger.info("Banco de dados já está atualizado")
+    return report
+
+
+def status(engine=None) -> List[Dict]:
+    """Lista todas as migrações conhecidas e se já foram aplicadas."""
+    if engine is None:
+        from app import app, db
+        with app.app_context():
+            engine = db.engine
+
+    applied = get_applied_versions(engine)
+    return [
+        {
+            'version': m.version,
+            'name': m.name,
+            'contract': m.contract,
+            'applied_at': applied[m.version]['applied_at'].isoformat() if m.version in applied else None,
+            'duration_ms': applied[m.version]['duration_ms'] if m.version in applied else None
+        }
+        for m in MIGRATIONS
+    ]
+
+
+# Migrações
+
+@migration(1, 'esquema inicial')
+def _initial_schema(ctx: MigrationContext):
+    ctx.create_tables(ctx.metadata)
+
+
+@migration(2, 'índices de agenda, telefone e status')
+def _core_indexes(ctx: MigrationContext):
+    ctx.create_index('ix_appointment_start_time', 'appointment', ['start_time'])
+    ctx.create_index('ix_appointment_patient_id', 'appointment', ['patient_id'])
+    ctx.create_index('ix_patient_responsible_phone', 'patient', ['responsible_phone'])
+    ctx.create_index('ix_budget_patient_id', 'budget', ['patient_id'])
+    # Status textuais só existem em bancos anteriores à migração 3
+    if ctx.has_column('appointment', 'status'):
+        ctx.create_index('ix_appointment_status', 'appointment', ['status'])
+    if ctx.has_column('budget', 'status'):
+        ctx.create_index('ix_budget_status', 'budget', ['status'])
+
+
+def _status_case(labels: Dict[int, str], default: int):
+    """Monta o CASE que traduz o status textual antigo para o código numérico."""
+    whens = ' '.join(f"WHEN :label_{code} THEN {code}" for code in labels)
+    params = {f'label_{code}': label for code, label in labels.items()}
+    return f"CASE COALESCE(status, :default_label) {whens} END", dict(params, default_label=labels[default])
+
+
+def _check_known_statuses(ctx: MigrationContext, table: str, labels: Dict[int, str]):
+    """Interrompe a migração se houver status que não têm código correspondente."""
+    if not ctx.has_column(table, 'status'):
+        return
+    with ctx.engine.connect() as conn:
+        found = {row[0] for row in conn.execute(text(
+            f"SELECT DISTINCT status FROM {table} WHERE status IS NOT NULL"
+        ))}
+    unknown = found - set(labels.values())
+    if unknown:
+        raise RuntimeError(
+            f"Status sem código em {table}: {sorted(unknown)}. Cadastre-os em status_codes.py antes de migrar."
+        )
+
+
+def _backfill_status_and_money(ctx: MigrationContext):
+    from status_codes import (APPOINTMENT_STATUS_LABELS, BUDGET_STATUS_LABELS,
+                              AppointmentStatus, BudgetStatus)
+
+    if ctx.has_column('appointment', 'status'):
+        case_sql, params = _status_case(APPOINTMENT_STATUS_LABELS, AppointmentStatus.AGENDADO)
+        ctx.backfill('appointment', f"status_code = {case_sql}", 'status_code IS NULL', params)
+
+    if ctx.has_column('budget', 'status'):
+        case_sql, params = _status_case(BUDGET_STATUS_LABELS, BudgetStatus.PENDENTE)
+        ctx.backfill('budget', f"status_code = {case_sql}", 'status_code IS NULL', params)
+
+    if ctx.has_column('budget', 'total_value'):
+        ctx.backfill(
+            'budget',
+            "total_value_cents = CAST(ROUND(total_value * 100) AS BIGINT)",
+            'total_value_cents IS NULL'
+        )
+
+
+@migration(3, 'status numéricos e valores em centavos')
+def _status_codes_and_cents(ctx: MigrationContext):
+    from status_codes import APPOINTMENT_STATUS_LABELS, BUDGET_STATUS_LABELS
+
+    _check_known_statuses(ctx, 'appointment', APPOINTMENT_STATUS_LABELS)
+    _check_known_statuses(ctx, 'budget', BUDGET_STATUS_LABELS)
+
+    ctx.add_column('appointment', 'status_code', 'SMALLINT')
+    ctx.add_column('budget', 'status_code', 'SMALLINT')
+    ctx.add_column('budget', 'total_value_cents', 'BIGINT')
+
+    _backfill_status_and_money(ctx)
+    # A nova versão não grava mais o valor em reais: o NOT NULL antigo barraria seus INSERTs
+    ctx.drop_not_null('budget', 'total_value')
+
+    ctx.create_index('ix_appointment_status_code_start_time', 'appointment', ['status_code', 'start_time'])
+    ctx.create_index('ix_budget_status_code_total_value_cents', 'budget', ['status_code', 'total_value_cents'])
+
+
+@migration(4, 'remover status textuais e valor em ponto flutuante', contract=True)
+def _drop_text_status_and_float(ctx: MigrationContext):
+    # Converte linhas gravadas pela versão anterior até ela sair do ar
+    _backfill_status_and_money(ctx)
+
+    ctx.drop_index('ix_appointment_status', 'appointment')
+    ctx.drop_index('ix_budget_status', 'budget')
+    ctx.drop_column('appointment', 'status')
+    ctx.drop_column('budget', 'status')
+    ctx.drop_column('budget', 'total_value')
+
+
+@migration(5, 'séries de agendamentos recorrentes')
+def _appointment_series(ctx: MigrationContext):
+    ctx.create_tables(ctx.metadata, ['appointment_series'])
+    ctx.add_column('appointment', 'series_id', 'INTEGER REFERENCES appointment_series (id)')
+    ctx.add_column('appointment', 'original_start', 'TIMESTAMP')
+    ctx.create_index('ix_appointment_series_id_original_start', 'appointment',
+                     ['series_id', 'original_start'], unique=True)
+
+
+@migration(6, 'templates de mensagens personalizados')
+def _message_templates(ctx: MigrationContext):
+    ctx.create_tables(ctx.metadata, ['message_template'])
+
+
+@migration(7, 'status e centavos obrigatórios', contract=True)
+def _status_and_cents_not_null(ctx: MigrationContext):
+    # Roda depois do preenchimento final da migração 4: o esquema atualizado fica igual ao de um banco novo
+    ctx.set_not_null('appointment', 'status_code')
+    ctx.set_not_null('budget', 'status_code')
+    ctx.set_not_null('budget', 'total_value_cents')
+
+
+@migration(8, 'versão do prontuário do paciente')
+def _patient_record_version(ctx: MigrationContext):
+    # Anulável e sem padrão: só catálogo. Pacientes existentes ficam com NULL, lido como versão 0
+    ctx.add_column('patient', 'record_version', 'INTEGER')
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='Migrações do banco de dados do OdontoSoft')
+    parser.add_argument('command', nargs='?', default='upgrade', choices=['upgrade', 'status'])
+    parser.add_argument('--target', type=int, help='Última versão a aplicar')
+    parser.add_argument('--batch-size', type=int, default=5000, help='Linhas por lote nos preenchimentos')
+    parser.add_argument('--contract', action='store_true',
+                        help='Aplica também as migrações de contração (após o deploy da nova versão)')
+    parser.add_argument('--batch-pause', type=float, default=0.0, help='Pausa entre lotes (segundos)')
+    args = parser.parse_args()
+
+    if args.command == 'status':
+        for item in status():
+            applied = item['applied_at'] or ('pendente (--contract)' if item['contract'] else 'pendente')
+            print(f"{item['version']:04d}  {item['name']:<55} {applied}")
+        return
+
+    report = upgrade(target=args.target, batch_size=args.batch_size, batch_pause=args.batch_pause,
+                     contract=args.contract or None)
+    for item in report:
+        print(f"{item['version']:04d} {item['name']}: {item['duration_ms']} ms")
+        for step in item['steps']:
+            print(f"    {step['duration_ms']:>8} ms  {step['step']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Expansão de séries de agendamentos recorrentes (no estilo RRULE).
+
+Uma série é guardada uma única vez (início, duração, frequência, intervalo e
+limite por quantidade ou data). As ocorrências são calculadas apenas para o
+intervalo consultado: o índice da primeira ocorrência é obtido por aritmética,
+sem percorrer a série desde o início, então uma série de vários anos custa o
+mesmo que uma de poucas semanas.
+"""
+
+import calendar
+from datetime import datetime, timedelta
+from typing import Iterator, Optional, Tuple
+
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY')
+
+# Limite de segurança para séries sem fim em consultas muito longas
+MAX_OCCURRENCES_PER_QUERY = 5000
+
+
+def _add_months(value: datetime, months: int) -> datetime:
+    """Soma meses mantendo o dia; dias inexistentes vão para o último dia do mês."""
+    month_index = value.month - 1 + months
+    year = value.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(value.day, calendar.monthrange(year, month)[1])
+    return value.replace(year=year, month=month, day=day)
+
+
+def occurrence_start(dtstart: datetime, freq: str, interval: int, index: int) -> datetime:
+    """Início da ocorrência de número `index` (a primeira é 0)."""
+    if freq == 'DAILY':
+        return dtstart + timedelta(days=interval * index)
+    if freq == 'WEEKLY':
+        return dtstart + timedelta(weeks=interval * index)
+    if freq == 'MONTHLY':
+        return _add_months(dtstart, interval * index)
+    raise ValueError(f"Frequência inválida: {freq}")
+
+
+def _first_index_at_or_after(dtstart: datetime, freq: str, interval: int, moment: datetime) -> int:
+    """Menor índice cuja ocorrência começa em `moment` ou depois."""
+    if moment <= dtstart:
+        return 0
+    if freq in ('DAILY', 'WEEKLY'):
+        step = timedelta(days=interval * (7 if freq == 'WEEKLY' else 1))
+        index = -(-(moment - dtstart) // step)  # divisão com arredondamento para cima
+    else:
+        months = (moment.year - dtstart.year) * 12 + moment.month - dtstart.month
+        index = max(months // interval - 1, 0)
+        while occurrence_start(dtstart, freq, interval, index) < moment:
+            index += 1
+    return index
+
+
+def last_occurrence_start(dtstart: datetime, freq: str, interval: int,
+                          count: Optional[int], until: Optional[datetime]) -> Optional[datetime]:
+    """Início da última ocorrência, ou None para séries sem fim."""
+    last = None
+    if count is not None:
+        last = occurrence_start(dtstart, freq, interval, count - 1)
+    if until is not None:
+        index = _first_index_at_or_after(dtstart, freq, interval, until)
+        if occurrence_start(dtstart, freq, interval, index) > until:
+            index -= 1
+        if index < 0:
+            return None
+        by_until = occurrence_start(dtstart, freq, interval, index)
+        last = by_until if last is None else min(last, by_until)
+    return last
+
+
+def expand(series, range_start: datetime, range_end: datetime) -> Iterator[Tuple[datetime, datetime]]:
+    """
+    Gera (início, fim) das ocorrências da série que se sobrepõem a [range_start, range_end).
+
+    Args:
+        series: Objeto com dtstart, duration_minutes, freq, interval, count e until
+        range_start: Início do intervalo consultado
+        range_end: Fim (exclusivo) do intervalo consultado
+    """
+    duration = timedelta(minutes=series.duration_minutes)
+    interval = series.interval or 1
+    # Ocorrências iniciadas até `duration` antes do intervalo ainda estão em andamento
+    index = _first_index_at_or_after(series.dtstart, series.freq, interval, range_start - duration)
+
+    produced = 0
+    while produced < MAX_OCCURRENCES_PER_QUERY:
+        if series.count is not None and index >= series.count:
+            return
+        start = occurrence_start(series.dtstart, series.freq, interval, index)
+        if start >= range_end or (series.until is not None and start > series.until):
+            return
+        end = start + duration
+        if end > range_start:
+            yield start, end
+            produced += 1
+        index += 1
+
+
+def is_occurrence(series, moment: datetime) -> bool:
+    """Verifica se `moment` é o início de uma ocorrência da série."""
+    interval = series.interval or 1
+    index = _first_index_at_or_after(series.dtstart, series.freq, interval, moment)
+    if series.count is not None and index >= series.count:
+        return False
+    if series.until is not None and moment > series.until:
+        return False
+    return occurrence_start(series.dtstart, series.freq, interval, index) == moment
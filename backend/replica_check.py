@@ -0,0 +1,90 @@
+"""
+Réplica de leitura com SQLite, para testes locais (ver db_routing.py).
+
+O banco usa WAL: alterações recentes podem estar só no arquivo -wal, e um `cp`
+do .db gera uma réplica incompleta ou corrompida. A cópia aqui usa a API de
+backup do SQLite, que lê o banco já com o WAL aplicado.
+
+Uso:
+    python replica_check.py                                        # verifica o roteamento em bancos temporários
+    python replica_check.py --copy instance/odontosoft.db instance/replica.db
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+
+
+def copy_sqlite(source: str, target: str):
+    """Copia um banco SQLite (inclusive o que ainda está no WAL) para `target`."""
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(target)
+    try:
+        with dst:
+            src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+
+
+def check_routing() -> bool:
+    """
+    Cria banco principal e réplica em uma pasta temporária e confere que:
+    sem X-Last-Write a leitura vem da réplica; com ele, do banco principal.
+
+    Returns:
+        True se o roteamento se comportou como esperado
+    """
+    workdir = tempfile.mkdtemp(prefix='odontosoft-replica-')
+    primary = os.path.join(workdir, 'primary.db')
+    replica = os.path.join(workdir, 'replica.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{primary}'
+    os.environ['READ_DATABASE_URL'] = f'sqlite:///{replica}'
+
+    from app import app, db
+    from db_routing import LAST_WRITE_HEADER
+    from migrations import upgrade
+
+    with app.app_context():
+        upgrade(db.engine, db.metadata)
+        db.engine.dispose()
+    copy_sqlite(primary, replica)
+
+    client = app.test_client()
+    response = client.post('/patients', json={
+        'name': 'Paciente Réplica', 'responsible_name': 'Responsável', 'responsible_phone': '5511999999999'
+    })
+    patient_id = response.get_json()['patient_id']
+    last_write = response.headers.get(LAST_WRITE_HEADER)
+
+    checks = [
+        ('escrita devolve X-Last-Write', last_write is not None),
+        ('leitura sem X-Last-Write usa a réplica',
+         client.get(f'/patients/{patient_id}').status_code == 404),
+        ('leitura com X-Last-Write usa o banco principal',
+         client.get(f'/patients/{patient_id}', headers={LAST_WRITE_HEADER: last_write or ''}).status_code == 200),
+    ]
+    for description, passed in checks:
+        print(f"  [{'ok' if passed else 'FALHOU'}] {description}")
+    print(f"Bancos em {workdir}")
+    return all(passed for _, passed in checks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cópia e verificação da réplica SQLite do OdontoSoft')
+    parser.add_argument('--copy', nargs=2, metavar=('ORIGEM', 'DESTINO'),
+                        help='Copia o banco principal para a réplica (seguro com WAL)')
+    args = parser.parse_args()
+
+    if args.copy:
+        copy_sqlite(*args.copy)
+        print(f"Réplica gravada em {args.copy[1]}")
+        return
+    if not check_routing():
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -13,17 +13,14 @@ import threading
 import json
 import os
 
-# Configuração de logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('scheduler.log'),
-        logging.StreamHandler()
-    ]
-)
+from logging_config import job_id_var, logged_job, sampled_logger, setup_logging
+
+# Configuração de logging (JSON, gravação em outra thread e rotação; ver logging_config.py)
+setup_logging('scheduler', log_file='scheduler.log')
 
 logger = logging.getLogger(__name__)
+# Uma linha por paciente: gravada por amostragem
+message_logger = sampled_logger(f'{__name__}.messages')
 
 class OdontoSoftScheduler:
     def __init__(self, api_base_url: str = "http://localhost:5000"):
@@ -47,7 +44,8 @@ class OdontoSoftScheduler:
             },
             'working_days': [0, 1, 2, 3, 4],  # Segunda a sexta (0=segunda)
             'retry_attempts': 3,
-            'retry_delay': 300  # 5 minutos
+            'retry_delay': 300,  # 5 minutos
+            'send_interval': 2  # Segundos entre envios de lembretes
         }
         
         self.load_config()
@@ -120,6 +118,10 @@ class OdontoSoftScheduler:
         """
         url = f"{self.api_base_url}{endpoint}"
         headers = {'Content-Type': 'application/json'}
+        # Liga os logs da API ao job que fez a requisição
+        job_id = job_id_var.get()
+        if job_id:
+            headers['X-Job-ID'] = job_id
         
         try:
             if method == 'GET':
@@ -136,13 +138,16 @@ class OdontoSoftScheduler:
             logger.error(f"Erro na requisição para {url}: {e}")
             return {'error': str(e)}
     
+    @logged_job('confirmations')
     def send_daily_confirmations(self):
         """Envia confirmações de consulta para o dia seguinte."""
         logger.info("Iniciando envio de confirmações diárias")
         
         try:
             # Busca consultas que precisam de confirmação
-            response = self.make_api_request('/automation/pending-confirmations')
+            response = self.make_api_request(
+                f"/automation/pending-confirmations?hours={self.config['confirmation_hours_before']}"
+            )
             
             if 'error' in response:
                 logger.error(f"Erro ao buscar confirmações pendentes: {response['error']}")
@@ -167,6 +172,7 @@ class OdontoSoftScheduler:
         except Exception as e:
             logger.error(f"Erro no envio de confirmações diárias: {e}")
     
+    @logged_job('reminders')
     def send_return_reminders(self):
         """Envia lembretes de retorno baseados na configuração."""
         logger.info("Iniciando envio de lembretes de retorno")
@@ -207,16 +213,19 @@ class OdontoSoftScheduler:
                         )
                         
                         if 'error' in result:
-                            logger.error(f"Erro ao enviar lembrete para paciente {patient['id']}: {result['error']}")
+                            logger.error(f"Erro ao enviar lembrete para paciente {patient['id']}: {result['error']}",
+                                         extra={'patient_id': patient['id']})
                         else:
-                            logger.info(f"Lembrete enviado para {patient['name']}")
+                            message_logger.info(f"Lembrete enviado para {patient['name']}",
+                                                extra={'patient_id': patient['id'], 'return_type': return_type})
                         
                         # Pequena pausa entre envios
-                        time.sleep(2)
+                        time.sleep(self.config['send_interval'])
                 
         except Exception as e:
             logger.error(f"Erro no envio de lembretes de retorno: {e}")
     
+    @logged_job('cleanup')
     def cleanup_old_logs(self):
         """Remove logs antigos para economizar espaço."""
         logger.info("Iniciando limpeza de logs antigos")
@@ -239,16 +248,20 @@ class OdontoSoftScheduler:
         except Exception as e:
             logger.error(f"Erro na limpeza de logs: {e}")
     
+    @logged_job('health_check')
     def health_check(self):
         """Verifica a saúde do sistema."""
         try:
-            response = self.make_api_request('/')
+            # A raiz da API responde texto, não JSON: basta o status HTTP
+            response = requests.get(f"{self.api_base_url}/", timeout=30)
             
-            if 'error' in response:
-                logger.warning(f"Sistema pode estar com problemas: {response['error']}")
+            if not response.ok:
+                logger.warning(f"Sistema pode estar com problemas: HTTP {response.status_code}")
             else:
                 logger.debug("Sistema funcionando normalmente")
                 
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Sistema pode estar com problemas: {e}")
         except Exception as e:
             logger.error(f"Erro na verificação de saúde: {e}")
     
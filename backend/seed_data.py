@@ -0,0 +1,253 @@
+"""
+Gerador de dados sintéticos para o OdontoSoft.
+Preenche pacientes, agendamentos, orçamentos e séries recorrentes com volumes realistas (nomes
+brasileiros, CPFs válidos e telefones no formato do WhatsApp) para testes de
+carga e benchmarks.
+
+Uso:
+    python seed_data.py                                   # 100 mil pacientes, 1 milhão de agendamentos
+    python seed_data.py --patients 5000 --appointments 50000 --budgets 10000 --series 500
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List
+
+from sqlalchemy import insert
+
+from recurrence import last_occurrence_start
+from status_codes import AppointmentStatus, BudgetStatus
+
+FIRST_NAMES = [
+    'Miguel', 'Arthur', 'Gael', 'Théo', 'Heitor', 'Ravi', 'Davi', 'Bernardo', 'Noah', 'Gabriel',
+    'Samuel', 'Pedro', 'Anthony', 'Isaac', 'Benício', 'Benjamin', 'Matheus', 'Lucas', 'Joaquim', 'Nicolas',
+    'Helena', 'Alice', 'Laura', 'Maria Alice', 'Valentina', 'Heloísa', 'Maria Clara', 'Maria Cecília', 'Maria Júlia', 'Sophia',
+    'Lorena', 'Lívia', 'Maria Luísa', 'Cecília', 'Eloá', 'Giovanna', 'Maria Helena', 'Antonella', 'Beatriz', 'Manuela',
+]
+
+ADULT_FIRST_NAMES = [
+    'Ana', 'Juliana', 'Fernanda', 'Patrícia', 'Aline', 'Camila', 'Amanda', 'Bruna', 'Letícia', 'Mariana',
+    'José', 'João', 'Antônio', 'Francisco', 'Carlos', 'Paulo', 'Rafael', 'Marcos', 'Luiz', 'Rodrigo',
+]
+
+LAST_NAMES = [
+    'Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira', 'Lima', 'Gomes',
+    'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Almeida', 'Lopes', 'Soares', 'Fernandes', 'Vieira', 'Barbosa',
+    'Rocha', 'Dias', 'Nascimento', 'Andrade', 'Moreira', 'Nunes', 'Marques', 'Machado', 'Mendes', 'Freitas',
+]
+
+# (cidade, UF, DDD)
+CITIES = [
+    ('São Paulo', 'SP', '11'), ('Campinas', 'SP', '19'), ('Rio de Janeiro', 'RJ', '21'),
+    ('Belo Horizonte', 'MG', '31'), ('Curitiba', 'PR', '41'), ('Porto Alegre', 'RS', '51'),
+    ('Salvador', 'BA', '71'), ('Recife', 'PE', '81'), ('Fortaleza', 'CE', '85'), ('Brasília', 'DF', '61'),
+]
+
+STREETS = ['Rua das Flores', 'Avenida Brasil', 'Rua XV de Novembro', 'Rua Sete de Setembro',
+           'Avenida Paulista', 'Rua Dom Pedro II', 'Rua Tiradentes', 'Avenida Getúlio Vargas']
+
+NEIGHBORHOODS = ['Centro', 'Jardim América', 'Vila Nova', 'Boa Vista', 'Santa Cecília', 'Bela Vista']
+
+TREATMENT_TYPES = ['Consulta inicial', 'Profilaxia', 'Aplicação de flúor', 'Restauração', 'Selante',
+                   'Extração', 'Manutenção ortodôntica', 'Tratamento de canal', 'Revisão semestral']
+
+BUDGET_DESCRIPTIONS = ['Tratamento restaurador', 'Aparelho ortodôntico', 'Profilaxia e flúor',
+                       'Selantes (4 dentes)', 'Tratamento de canal em decíduo', 'Extração e mantenedor de espaço']
+
+# (status, peso) dos agendamentos e orçamentos gerados
+APPOINTMENT_STATUSES = [
+    (AppointmentStatus.REALIZADO, 70), (AppointmentStatus.AGENDADO, 15),
+    (AppointmentStatus.CONFIRMADO, 8), (AppointmentStatus.CANCELADO, 7),
+]
+BUDGET_STATUSES = [(BudgetStatus.PENDENTE, 40), (BudgetStatus.APROVADO, 45), (BudgetStatus.RECUSADO, 15)]
+
+SLOT_MINUTES = 30
+
+
+def cpf_from_number(number: int) -> str:
+    """Gera um CPF válido (com dígitos verificadores) a partir dos 9 dígitos base."""
+    digits = [int(d) for d in f"{number % 10**9:09d}"]
+    for weight_start in (10, 11):
+        total = sum(d * w for d, w in zip(digits, range(weight_start, 1, -1)))
+        check = (total * 10) % 11
+        digits.append(0 if check == 10 else check)
+    cpf = ''.join(str(d) for d in digits)
+    return f"{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}"
+
+
+def generate_patients(count: int, rng: random.Random, start: int = 0) -> Iterator[Dict]:
+    """Gera pacientes com CPF e e-mail únicos (a partir do índice `start`)."""
+    for i in range(start, start + count):
+        last_name = f"{rng.choice(LAST_NAMES)} {rng.choice(LAST_NAMES)}"
+        child = f"{rng.choice(FIRST_NAMES)} {last_name}"
+        responsible_first = rng.choice(ADULT_FIRST_NAMES)
+        city, state, ddd = rng.choice(CITIES)
+        yield {
+            'name': child,
+            'email': f"{responsible_first.lower()}.{i}@exemplo.com.br",
+            'responsible_name': f"{responsible_first} {last_name}",
+            'responsible_phone': f"55{ddd}9{rng.randint(10000000, 99999999)}",
+            # Multiplicador coprimo com 10^9 garante CPFs distintos
+            'responsible_cpf': cpf_from_number(i * 7919 + 100000000),
+            'address_zip_code': f"{rng.randint(10000, 99999)}-{rng.randint(0, 999):03d}",
+            'address_street': rng.choice(STREETS),
+            'address_number': str(rng.randint(1, 3000)),
+            'address_complement': rng.choice([None, None, 'Apto 12', 'Casa 2', 'Bloco B']),
+            'address_neighborhood': rng.choice(NEIGHBORHOODS),
+            'address_city': city,
+            'address_state': state,
+        }
+
+
+def random_slot(rng: random.Random, start: datetime, days: int) -> datetime:
+    """Sorteia um horário de consulta em dia útil, entre 8h e 18h."""
+    while True:
+        day = start + timedelta(days=rng.randrange(days))
+        if day.weekday() < 5:
+            break
+    slot = rng.randrange((18 - 8) * 60 // SLOT_MINUTES)
+    return day.replace(hour=8, minute=0, second=0, microsecond=0) + timedelta(minutes=slot * SLOT_MINUTES)
+
+
+def generate_appointments(count: int, patient_ids: List[int], rng: random.Random) -> Iterator[Dict]:
+    """Gera agendamentos nos últimos 2 anos e nos próximos 3 meses."""
+    start = datetime.now() - timedelta(days=730)
+    statuses, weights = zip(*APPOINTMENT_STATUSES)
+    now = datetime.now()
+    for _ in range(count):
+        start_time = random_slot(rng, start, 820)
+        status = rng.choices(statuses, weights)[0]
+        if start_time > now and status == AppointmentStatus.REALIZADO:
+            status = AppointmentStatus.AGENDADO
+        yield {
+            'patient_id': rng.choice(patient_ids),
+            'start_time': start_time,
+            'end_time': start_time + timedelta(minutes=SLOT_MINUTES * rng.choice([1, 1, 2])),
+            'status_code': status,
+            'notes': rng.choice([None, None, 'Paciente ansioso', 'Trazer exames', 'Retorno']),
+            'treatment_type': rng.choice(TREATMENT_TYPES),
+        }
+
+
+def generate_budgets(count: int, patient_ids: List[int], rng: random.Random) -> Iterator[Dict]:
+    """Gera orçamentos entre R$ 80,00 e R$ 8.000,00 (em centavos)."""
+    statuses, weights = zip(*BUDGET_STATUSES)
+    start = datetime.now() - timedelta(days=730)
+    for _ in range(count):
+        yield {
+            'patient_id': rng.choice(patient_ids),
+            'description': rng.choice(BUDGET_DESCRIPTIONS),
+            'total_value_cents': rng.randint(80_00, 8_000_00),
+            'status_code': rng.choices(statuses, weights)[0],
+            'created_at': start + timedelta(minutes=rng.randrange(730 * 24 * 60)),
+        }
+
+
+# (frequência, intervalo, quantidade, tratamento) das séries recorrentes
+SERIES_PATTERNS = [
+    ('MONTHLY', 1, 24, 'Manutenção ortodôntica'),
+    ('MONTHLY', 6, None, 'Profilaxia'),
+    ('WEEKLY', 1, 8, 'Tratamento de canal'),
+]
+
+
+def generate_series(count: int, patient_ids: List[int], rng: random.Random) -> Iterator[Dict]:
+    """Gera séries recorrentes (ortodontia mensal, profilaxia semestral, tratamentos semanais)."""
+    start = datetime.now() - timedelta(days=365)
+    for _ in range(count):
+        freq, interval, occurrences, treatment = rng.choice(SERIES_PATTERNS)
+        dtstart = random_slot(rng, start, 365)
+        duration = SLOT_MINUTES * rng.choice([1, 2])
+        last_start = last_occurrence_start(dtstart, freq, interval, occurrences, None)
+        yield {
+            'patient_id': rng.choice(patient_ids),
+            'dtstart': dtstart,
+            'duration_minutes': duration,
+            'freq': freq,
+            'interval': interval,
+            'count': occurrences,
+            'ends_at': last_start + timedelta(minutes=duration) if last_start else None,
+            'treatment_type': treatment,
+            'created_at': dtstart,
+        }
+
+
+def bulk_insert(session, model, rows: Iterator[Dict], batch_size: int, label: str) -> int:
+    """Insere as linhas em lotes, confirmando cada lote."""
+    inserted = 0
+    batch = []
+    started = time.perf_counter()
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            session.execute(insert(model), batch)
+            session.commit()
+            inserted += len(batch)
+            batch = []
+            print(f"  {label}: {inserted} inseridos", end='\r')
+    if batch:
+        session.execute(insert(model), batch)
+        session.commit()
+        inserted += len(batch)
+    print(f"  {label}: {inserted} inseridos em {time.perf_counter() - started:.1f} s")
+    return inserted
+
+
+def seed(patients: int, appointments: int, budgets: int, series: int = 0, batch_size: int = 10000,
+         seed_value: int = 42) -> Dict:
+    """
+    Popula o banco configurado em DATABASE_URL.
+
+    Returns:
+        Dict com a quantidade de linhas inseridas por tabela
+    """
+    from app import app, db, Patient, Appointment, AppointmentSeries, Budget
+    from migrations import upgrade
+
+    rng = random.Random(seed_value)
+
+    with app.app_context():
+        upgrade(db.engine, db.metadata)
+
+        first_new_id = (db.session.query(db.func.max(Patient.id)).scalar() or 0) + 1
+        counts = {'patients': bulk_insert(
+            db.session, Patient, generate_patients(patients, rng, first_new_id), batch_size, 'pacientes'
+        )}
+
+        patient_ids = [row[0] for row in db.session.query(Patient.id).filter(Patient.id >= first_new_id)]
+        if not patient_ids:
+            patient_ids = [row[0] for row in db.session.query(Patient.id)]
+        if not patient_ids:
+            return counts
+
+        counts['appointments'] = bulk_insert(
+            db.session, Appointment, generate_appointments(appointments, patient_ids, rng), batch_size, 'agendamentos'
+        )
+        counts['budgets'] = bulk_insert(
+            db.session, Budget, generate_budgets(budgets, patient_ids, rng), batch_size, 'orçamentos'
+        )
+        counts['series'] = bulk_insert(
+            db.session, AppointmentSeries, generate_series(series, patient_ids, rng), batch_size, 'séries'
+        )
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gera dados sintéticos para o OdontoSoft')
+    parser.add_argument('--patients', type=int, default=100_000)
+    parser.add_argument('--appointments', type=int, default=1_000_000)
+    parser.add_argument('--budgets', type=int, default=200_000)
+    parser.add_argument('--series', type=int, default=10_000, help='Séries de agendamentos recorrentes')
+    parser.add_argument('--batch-size', type=int, default=10_000)
+    parser.add_argument('--seed', type=int, default=42, help='Semente do gerador (resultados reprodutíveis)')
+    args = parser.parse_args()
+
+    print("Gerando dados sintéticos...")
+    counts = seed(args.patients, args.appointments, args.budgets, args.series, args.batch_size, args.seed)
+    print(f"Concluído: {counts}")
+
+
+if __name__ == '__main__':
+    main()
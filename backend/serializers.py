@@ -0,0 +1,148 @@
+"""
+Serialização dos modelos do OdontoSoft para as respostas JSON da API.
+Mantém o formato de cada recurso em um único lugar, para que listagens e
+prontuário devolvam exatamente os mesmos campos.
+
+O banco guarda valores em centavos (inteiros) e status como códigos
+numéricos; a API continua trabalhando com reais e rótulos em português.
+"""
+
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from typing import Callable, Dict, Optional
+
+from status_codes import AppointmentStatus, appointment_status_label, budget_status_label
+
+
+def to_cents(value) -> int:
+    """Converte um valor em reais (número ou texto) para centavos, sem erro de ponto flutuante."""
+    try:
+        amount = Decimal(str(value)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"Valor inválido: {value}")
+    if not amount.is_finite():
+        raise ValueError(f"Valor inválido: {value}")
+    return int(amount * 100)
+
+
+def from_cents(cents: Optional[int]) -> Optional[float]:
+    """
+    Converte centavos para reais no formato numérico da API.
+    Aceita o Decimal que o PostgreSQL devolve em SUM(bigint), que o JSON
+    serializaria como texto.
+    """
+    return None if cents is None else int(cents) / 100
+
+
+def serialize_patient(patient) -> Dict:
+    return {
+        'id': patient.id,
+        'name': patient.name,
+        'email': patient.email,
+        'responsible_name': patient.responsible_name,
+        'responsible_phone': patient.responsible_phone,
+        'responsible_cpf': patient.responsible_cpf,
+        'address_zip_code': patient.address_zip_code,
+        'address_street': patient.address_street,
+        'address_number': patient.address_number,
+        'address_complement': patient.address_complement,
+        'address_neighborhood': patient.address_neighborhood,
+        'address_city': patient.address_city,
+        'address_state': patient.address_state
+    }
+
+
+def _patient_name(item, patient_name: Optional[str]) -> str:
+    if patient_name is not None:
+        return patient_name
+    # Verifica se patient_data existe antes de acessar .name
+    return item.patient_data.name if item.patient_data else "Paciente Desconhecido"
+
+
+def serialize_appointment(appt, patient_name: Optional[str] = None) -> Dict:
+    """
+    Args:
+        appt: Agendamento
+        patient_name: Nome do paciente já conhecido (evita carregar o relacionamento)
+    """
+    return {
+        'id': appt.id,
+        'patient_id': appt.patient_id,
+        'patient_name': _patient_name(appt, patient_name),
+        'start_time': appt.start_time.isoformat(),
+        'end_time': appt.end_time.isoformat(),
+        'status': appointment_status_label(appt.status_code),
+        'notes': appt.notes,
+        'treatment_type': appt.treatment_type,
+        'series_id': appt.series_id,
+        'original_start': appt.original_start.isoformat() if appt.original_start else None
+    }
+
+
+def serialize_occurrence(series, start, end, patient_name: Optional[str] = None) -> Dict:
+    """
+    Ocorrência virtual de uma série (ainda não materializada no banco).
+    Tem o mesmo formato de um agendamento, com id vazio.
+    """
+    return {
+        'id': None,
+        'patient_id': series.patient_id,
+        'patient_name': _patient_name(series, patient_name),
+        'start_time': start.isoformat(),
+        'end_time': end.isoformat(),
+        'status': appointment_status_label(AppointmentStatus.AGENDADO),
+        'notes': series.notes,
+        'treatment_type': series.treatment_type,
+        'series_id': series.id,
+        'original_start': start.isoformat()
+    }
+
+
+def serialize_series(series) -> Dict:
+    return {
+        'id': series.id,
+        'patient_id': series.patient_id,
+        'start_time': series.dtstart.isoformat(),
+        'duration_minutes': series.duration_minutes,
+        'freq': series.freq,
+        'interval': series.interval,
+        'count': series.count,
+        'until': series.until.isoformat() if series.until else None,
+        'treatment_type': series.treatment_type,
+        'notes': series.notes
+    }
+
+
+def serialize_budget(budget, patient_name: Optional[str] = None) -> Dict:
+    """
+    Args:
+        budget: Orçamento
+        patient_name: Nome do paciente já conhecido (evita carregar o relacionamento)
+    """
+    return {
+        'id': budget.id,
+        'patient_id': budget.patient_id,
+        'patient_name': _patient_name(budget, patient_name),
+        'description': budget.description,
+        'total_value': from_cents(budget.total_value_cents),
+        'status': budget_status_label(budget.status_code),
+        'created_at': budget.created_at.isoformat()
+    }
+
+
+def paginate(query, page: int, per_page: int, serializer: Callable) -> Dict:
+    """
+    Pagina uma consulta ordenada no banco: um COUNT e um SELECT com LIMIT/OFFSET,
+    então o custo depende do tamanho da página, não do histórico inteiro.
+
+    Returns:
+        Dict com os itens da página e os metadados da paginação
+    """
+    total = query.order_by(None).count()
+    items = query.limit(per_page).offset((page - 1) * per_page).all() if total else []
+    return {
+        'items': [serializer(item) for item in items],
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'pages': (total + per_page - 1) // per_page
+    }
@@ -0,0 +1,65 @@
+"""
+Códigos numéricos dos status de agendamentos e orçamentos.
+O banco guarda apenas o código (SMALLINT indexado); a API continua recebendo e
+devolvendo os rótulos em português (ver serializers.py).
+
+Para um novo status, acrescente um membro ao enum e o rótulo correspondente.
+Nunca reaproveite ou renumere códigos existentes.
+"""
+
+from enum import IntEnum
+from typing import Dict, Optional
+
+
+class AppointmentStatus(IntEnum):
+    AGENDADO = 1
+    CONFIRMADO = 2
+    REALIZADO = 3
+    CANCELADO = 4
+
+
+class BudgetStatus(IntEnum):
+    PENDENTE = 1
+    APROVADO = 2
+    RECUSADO = 3
+
+
+APPOINTMENT_STATUS_LABELS: Dict[int, str] = {
+    AppointmentStatus.AGENDADO: 'Agendado',
+    AppointmentStatus.CONFIRMADO: 'Confirmado',
+    AppointmentStatus.REALIZADO: 'Realizado',
+    AppointmentStatus.CANCELADO: 'Cancelado',
+}
+
+BUDGET_STATUS_LABELS: Dict[int, str] = {
+    BudgetStatus.PENDENTE: 'Pendente',
+    BudgetStatus.APROVADO: 'Aprovado',
+    BudgetStatus.RECUSADO: 'Recusado',
+}
+
+_APPOINTMENT_CODES = {label.lower(): code for code, label in APPOINTMENT_STATUS_LABELS.items()}
+_BUDGET_CODES = {label.lower(): code for code, label in BUDGET_STATUS_LABELS.items()}
+
+
+def appointment_status_label(code: Optional[int]) -> Optional[str]:
+    return APPOINTMENT_STATUS_LABELS.get(code)
+
+
+def budget_status_label(code: Optional[int]) -> Optional[str]:
+    return BUDGET_STATUS_LABELS.get(code)
+
+
+def appointment_status_code(label: str) -> AppointmentStatus:
+    """Converte o rótulo recebido pela API; ValueError se não existir."""
+    try:
+        return _APPOINTMENT_CODES[label.strip().lower()]
+    except (KeyError, AttributeError):
+        raise ValueError(f"Status de agendamento inválido: {label}")
+
+
+def budget_status_code(label: str) -> BudgetStatus:
+    """Converte o rótulo recebido pela API; ValueError se não existir."""
+    try:
+        return _BUDGET_CODES[label.strip().lower()]
+    except (KeyError, AttributeError):
+        raise ValueError(f"Status de orçamento inválido: {label}")
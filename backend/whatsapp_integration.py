@@ -3,27 +3,45 @@ Módulo de integração com o WhatsApp Bot existente.
 Este módulo gerencia a comunicação entre o OdontoSoft e o bot do WhatsApp.
 """
 
+import logging
 import requests
 import json
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+
+from attachments import AttachmentError, AttachmentUploader, MediaCache
+from logging_config import sampled_logger
+from message_templates import DEFAULT_LOCALE, format_appointment_datetime, templates
+
+logger = logging.getLogger(__name__)
+# Uma linha por mensagem enviada: gravada por amostragem
+message_logger = sampled_logger(f'{__name__}.messages')
 
 class WhatsAppIntegration:
-    def __init__(self, bot_api_url: str = None, api_key: str = None):
+    def __init__(self, bot_api_url: str = None, api_key: str = None,
+                 locale: str = DEFAULT_LOCALE, clinic_id: Optional[int] = None,
+                 media_cache: Optional[MediaCache] = None):
         """
         Inicializa a integração com o WhatsApp Bot.
         
         Args:
             bot_api_url: URL da API do seu bot WhatsApp
             api_key: Chave de API para autenticação (se necessário)
+            locale: Idioma das mensagens (pt_BR, es, en)
+            clinic_id: Clínica cujos templates personalizados devem ser usados
+            media_cache: Cache de media ids dos anexos (compartilhável entre instâncias)
         """
         self.bot_api_url = bot_api_url or "http://localhost:3000"  # URL padrão do seu bot
         self.api_key = api_key
+        self.locale = locale
+        self.clinic_id = clinic_id
         self.headers = {
             'Content-Type': 'application/json'
         }
         if api_key:
             self.headers['Authorization'] = f'Bearer {api_key}'
+        # Cada arquivo distinto é enviado ao bot uma vez; depois só o media id é reutilizado
+        self.attachments = AttachmentUploader(self.bot_api_url, self.headers, media_cache)
     
     def send_message(self, phone: str, message: str) -> Dict:
         """
@@ -52,16 +70,42 @@ class WhatsAppIntegration:
                 'status': 'sent'
             }
             
-            print(f"[WhatsApp] Mensagem enviada para {phone}: {message}")
+            message_logger.info(f"Mensagem enviada para {phone}", extra={
+                'phone': phone, 'message_id': response['message_id'], 'chars': len(message)
+            })
             return response
             
         except Exception as e:
+            logger.exception(f"Erro ao enviar mensagem para {phone}", extra={'phone': phone})
             return {
                 'success': False,
                 'error': str(e),
                 'phone': phone
             }
     
+    def send_media(self, phone: str, media_id: str, filename: str) -> Dict:
+        """
+        Envia um anexo já carregado no bot, referenciado pelo media id.
+        
+        Args:
+            phone: Número do telefone (formato: 5511999999999)
+            media_id: Identificador devolvido pelo upload
+            filename: Nome exibido ao destinatário
+            
+        Returns:
+            Dict com o resultado da operação
+        """
+        # Aqui você faria a chamada para a API do seu bot
+        # Por enquanto, simulamos o envio
+        return {
+            'success': True,
+            'message_id': f'msg_{datetime.now().timestamp()}',
+            'phone': phone,
+            'media_id': media_id,
+            'filename': filename,
+            'status': 'sent'
+        }
+    
     def send_confirmation_message(self, patient_data: Dict, appointment_data: Dict) -> Dict:
         """
         Envia mensagem de confirmação de consulta.
@@ -77,26 +121,14 @@ class WhatsAppIntegration:
         phone = patient_data.get('responsible_phone') or patient_data.get('phone')
         name = patient_data.get('responsible_name') or patient_data.get('name')
         
-        # Formata a data e hora
-        appointment_datetime = datetime.fromisoformat(appointment_data['start_time'])
-        formatted_date = appointment_datetime.strftime('%d/%m/%Y')
-        formatted_time = appointment_datetime.strftime('%H:%M')
+        # Formata a data e hora (valores repetidos saem do cache)
+        formatted_date, formatted_time = format_appointment_datetime(appointment_data['start_time'], self.locale)
         
-        # Monta a mensagem
-        message = f"""🦷 *Confirmação de Consulta - Dentinhos de Leite*
-
-Olá {name}! 
-
-Sua consulta está agendada para:
-📅 Data: {formatted_date}
-🕐 Horário: {formatted_time}
-
-Por favor, confirme sua presença respondendo:
-✅ *SIM* - para confirmar
-❌ *NÃO* - para cancelar
-🔄 *REAGENDAR* - para remarcar
-
-Aguardamos sua confirmação! 😊"""
+        message = templates.render('confirmation', {
+            'name': name,
+            'date': formatted_date,
+            'time': formatted_time
+        }, self.locale, self.clinic_id)
 
         return self.send_message(phone, message)
     
@@ -114,18 +146,10 @@ Aguardamos sua confirmação! 😊"""
         phone = patient_data.get('responsible_phone') or patient_data.get('phone')
         name = patient_data.get('responsible_name') or patient_data.get('name')
         
-        message = f"""🦷 *Lembrete de Retorno - Dentinhos de Leite*
-
-Olá {name}! 
-
-É hora do retorno para {return_type}! 
-
-Para agendar sua consulta:
-📞 Entre em contato conosco
-💬 Responda esta mensagem
-🌐 Acesse nosso site
-
-Cuidar dos dentinhos é muito importante! 😊"""
+        message = templates.render('return_reminder', {
+            'name': name,
+            'return_type': return_type
+        }, self.locale, self.clinic_id)
 
         return self.send_message(phone, message)
     
@@ -139,31 +163,64 @@ Cuidar dos dentinhos é muito importante! 😊"""
             custom_message: Mensagem personalizada
             
         Returns:
-            Dict com o resultado da operação
+            Dict com o resultado da operação; files_sent e files_failed detalham
+            cada arquivo (media_id, sha256 e se o upload foi reaproveitado)
         """
         phone = patient_data.get('responsible_phone') or patient_data.get('phone')
         name = patient_data.get('responsible_name') or patient_data.get('name')
         
-        base_message = custom_message or f"""🦷 *Orientações Pós-Consulta - Dentinhos de Leite*
-
-Olá {name}! 
+        base_message = custom_message or templates.render(
+            'post_appointment', {'name': name}, self.locale, self.clinic_id
+        )
 
-Seguem as orientações importantes para o cuidado após a consulta.
-
-Por favor, leia com atenção e siga as recomendações.
-
-Qualquer dúvida, estamos à disposição! 😊"""
-
-        # Por enquanto, simulamos o envio de arquivos
-        # Na implementação real, você integraria com a API do seu bot para envio de arquivos
         result = self.send_message(phone, base_message)
         
         if result['success']:
-            result['files_sent'] = files
-            print(f"[WhatsApp] Arquivos enviados: {files}")
+            result['files_sent'] = []
+            result['files_failed'] = []
+            for path in files:
+                try:
+                    media = self.attachments.get_media_id(path)
+                except AttachmentError as e:
+                    result['files_failed'].append({'file': path, 'error': str(e)})
+                    continue
+                sent = self.send_media(phone, media['media_id'], media['file'])
+                media['status'] = sent.get('status')
+                result['files_sent' if sent['success'] else 'files_failed'].append(media)
+            message_logger.info(f"Arquivos enviados para {phone}", extra={
+                'phone': phone,
+                'files': [media['file'] for media in result['files_sent']],
+                'uploads': sum(not media['cached'] for media in result['files_sent'])
+            })
+            for failure in result['files_failed']:
+                logger.warning(f"Falha no envio de {failure['file']}: {failure.get('error', failure.get('status'))}",
+                               extra={'phone': phone})
         
         return result
     
+    def send_confirmation_batch(self, items: List[Tuple[Dict, Dict]]) -> List[Dict]:
+        """
+        Envia confirmações para vários agendamentos de uma vez.
+        O template é resolvido uma única vez e cada horário distinto é
+        formatado uma única vez, mesmo que vários pacientes o compartilhem.
+        
+        Args:
+            items: Lista de tuplas (dados do paciente, dados do agendamento)
+            
+        Returns:
+            Lista com o resultado de cada envio, na mesma ordem
+        """
+        recipients = [{
+            'name': patient_data.get('responsible_name') or patient_data.get('name'),
+            'start_time': appointment_data['start_time']
+        } for patient_data, appointment_data in items]
+        messages = templates.render_batch('confirmation', recipients, self.locale, self.clinic_id)
+        
+        return [
+            self.send_message(patient_data.get('responsible_phone') or patient_data.get('phone'), message)
+            for (patient_data, _), message in zip(items, messages)
+        ]
+    
     def process_incoming_message(self, message_data: Dict) -> Dict:
         """
         Processa mensagens recebidas do WhatsApp.
@@ -231,20 +288,25 @@ Qualquer dúvida, estamos à disposição! 😊"""
         """
         # Esta função deve ser implementada para atualizar o banco de dados
         # Por enquanto, retorna True
-        print(f"[WhatsApp] Status do agendamento atualizado: {phone} -> {status}")
+        logger.info(f"Status do agendamento atualizado: {phone} -> {status}", extra={'phone': phone, 'status': status})
         return True
 
 # Instância global para uso na aplicação
 whatsapp = WhatsAppIntegration()
 
-def configure_whatsapp_integration(bot_url: str, api_key: str = None):
+def configure_whatsapp_integration(bot_url: str, api_key: str = None,
+                                   locale: str = DEFAULT_LOCALE, clinic_id: Optional[int] = None):
     """
     Configura a integração com o WhatsApp.
     
     Args:
         bot_url: URL da API do bot
         api_key: Chave de API (opcional)
+        locale: Idioma das mensagens (opcional)
+        clinic_id: Clínica dos templates personalizados (opcional)
     """
     global whatsapp
-    whatsapp = WhatsAppIntegration(bot_url, api_key)
+    # Mantém os media ids já conhecidos se o bot continuar o mesmo
+    media_cache = whatsapp.attachments.cache if whatsapp.bot_api_url == bot_url else None
+    whatsapp = WhatsAppIntegration(bot_url, api_key, locale, clinic_id, media_cache)
 
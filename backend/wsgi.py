@@ -0,0 +1,12 @@
+"""
+Ponto de entrada WSGI do OdontoSoft para produção.
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+O esquema do banco não é criado aqui: aplique as migrações antes do deploy
+com `python migrations.py`.
+"""
+
+from app import app
+
+application = app
@@ -22,6 +22,18 @@ import 'react-day-picker/dist/style.css' // Estilos padrão do react-day-picker
 // URL do backend - ajuste conforme necessário
 const API_BASE_URL = 'https://odontosoft-backend.onrender.com' // Use a sua URL real do backend no Render
 
+// Horário da última escrita informado pela API (cabeçalho X-Last-Write). Reenviado nas
+// requisições seguintes para que a API leia do banco principal até a réplica alcançar a gravação
+let lastWriteAt = null
+
+const apiFetch = async (path, options = {}) => {
+  const headers = { ...options.headers }
+  if (lastWriteAt) headers['X-Last-Write'] = lastWriteAt
+  const response = await fetch(`${API_BASE_URL}${path}`, { ...options, headers })
+  lastWriteAt = response.headers.get('X-Last-Write') || lastWriteAt
+  return response
+}
+
 function App( ) {
   const [activeTab, setActiveTab] = useState('dashboard')
 
@@ -88,7 +100,7 @@ function App( ) {
 
   const addPatient = async () => {
     try {
-      const response = await fetch(`${API_BASE_URL}/patients`, {
+      const response = await apiFetch('/patients', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -126,7 +138,7 @@ function App( ) {
 
   const loadPatients = async () => {
     try {
-      const response = await fetch(`${API_BASE_URL}/patients`)
+      const response = await apiFetch('/patients')
       if (response.ok) {
         const data = await response.json()
         setPatients(data.patients)
@@ -138,7 +150,7 @@ function App( ) {
 
   const loadAppointments = async () => {
     try {
-      const response = await fetch(`${API_BASE_URL}/appointments`)
+      const response = await apiFetch('/appointments')
       if (response.ok) {
         const data = await response.json()
         setAppointments(data.appointments)
@@ -150,7 +162,7 @@ function App( ) {
 
   const loadBudgets = async () => {
     try {
-      const response = await fetch(`${API_BASE_URL}/budgets`)
+      const response = await apiFetch('/budgets')
       if (response.ok) {
         const data = await response.json()
         setBudgets(data.budgets)
@@ -162,7 +174,7 @@ function App( ) {
 
   const sendConfirmation = async (appointmentId) => {
     try {
-      const response = await fetch(`${API_BASE_URL}/whatsapp/send-confirmation`, {
+      const response = await apiFetch('/whatsapp/send-confirmation', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -196,7 +208,7 @@ function App( ) {
         end_time: newAppointment.end_time.toISOString(),
       }
 
-      const response = await fetch(`${API_BASE_URL}/appointments`, {
+      const response = await apiFetch('/appointments', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',